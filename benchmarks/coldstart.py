@@ -0,0 +1,158 @@
+"""冷启动测量：页面顶层导入耗时、服务器启动到健康检查通过的时间和各页面首次渲染的时间。
+
+“首次渲染”从启动 ``streamlit run`` 开始计时，到通过 websocket 打开页面、页面脚本执行完毕
+（服务器发出 script_finished）为止；健康检查在任何页面脚本运行之前就会通过，
+反映不了页面导入的变化。每项测量都在新的子进程 / 新的服务器中进行，取 ``--repeat`` 次的中位数。
+
+``--app-dir`` 指定要测量的 cashflow 目录，可以用 git worktree 检出修改前的提交，
+用同一份脚本测量修改前后::
+
+    git worktree add /tmp/cashflow-before <修改前的提交>
+    python benchmarks/coldstart.py --app-dir /tmp/cashflow-before/cashflow --output before.json
+    python benchmarks/coldstart.py --compare before.json
+    git worktree remove /tmp/cashflow-before
+
+首次渲染需要 websockets 库（``pip install -r requirements-dev.txt``）。
+"""
+
+import argparse
+import ast
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PAGES = {
+    "00": "00.py",
+    "01": os.path.join("pages", "01.py"),
+    "02": os.path.join("pages", "02.py"),
+}
+
+
+def top_level_imports(path):
+    """页面脚本顶层（不含函数体内）的 import 语句。"""
+    with open(path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def time_imports(app_dir, statements):
+    """在新进程中执行 ``statements``，返回耗时（秒）。"""
+    code = (
+        "import sys, time\n"
+        f"sys.path.insert(0, {app_dir!r})\n"
+        "start = time.perf_counter()\n"
+        + "".join(f"{statement}\n" for statement in statements)
+        + "print(time.perf_counter() - start)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, cwd=app_dir)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_health(port, start, timeout):
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError("streamlit 服务器未能在超时时间内启动")
+
+
+def _render_page(port, page, timeout):
+    """像浏览器一样打开页面：连接 websocket，请求运行脚本，等待 script_finished。"""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from websockets.sync.client import connect
+
+    request = BackMsg()
+    request.rerun_script.query_string = ""
+    request.rerun_script.page_name = "" if page == "00" else page
+    with connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None) as ws:
+        ws.send(request.SerializeToString())
+        while True:
+            message = ForwardMsg()
+            message.ParseFromString(ws.recv(timeout=timeout))
+            kind = message.WhichOneof("type")
+            if kind == "page_not_found":
+                raise RuntimeError(f"页面 {page} 不存在")
+            if kind == "script_finished":
+                return
+
+
+def time_first_render(app_dir, page, timeout=120):
+    """启动 ``streamlit run <app_dir>/00.py`` 并打开 ``page``。
+
+    返回 (健康检查通过的秒数, 页面脚本首次执行完毕的秒数)，都从启动进程开始计时。
+    """
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(app_dir, PAGES["00"]),
+         "--server.headless", "true", "--server.port", str(port), "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false", "--global.developmentMode", "false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=app_dir,
+    )
+    try:
+        health = _wait_for_health(port, start, timeout)
+        _render_page(port, page, timeout)
+        return health, time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cashflow 冷启动测量")
+    parser.add_argument("--app-dir", default=os.path.join(ROOT, "cashflow"),
+                        help="要测量的 cashflow 目录（默认本仓库）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-server", action="store_true", help="只测量导入耗时，不启动服务器")
+    parser.add_argument("--output", help="把结果保存为 JSON")
+    parser.add_argument("--compare", help="与之前保存的结果对比")
+    args = parser.parse_args()
+    app_dir = os.path.abspath(args.app_dir)
+
+    results = {"streamlit": statistics.median(time_imports(app_dir, ["import streamlit"]) for _ in range(args.repeat))}
+    for page, path in PAGES.items():
+        statements = top_level_imports(os.path.join(app_dir, path))
+        results[f"page {page} imports"] = statistics.median(
+            time_imports(app_dir, statements) for _ in range(args.repeat)
+        )
+    if not args.no_server:
+        for page in PAGES:
+            runs = [time_first_render(app_dir, page) for _ in range(args.repeat)]
+            if page == "00":
+                results["server health"] = statistics.median(health for health, _ in runs)
+            results[f"first render {page}"] = statistics.median(render for _, render in runs)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            previous = json.load(fh)
+    for name, seconds in results.items():
+        line = f"{name:<20} {seconds * 1000:>10.1f} ms"
+        if name in previous:
+            line += f"   之前 {previous[name] * 1000:>10.1f} ms ({seconds / previous[name] - 1:+.0%})"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
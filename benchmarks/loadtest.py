@@ -0,0 +1,271 @@
+"""多会话负载测试：用 Streamlit 的 AppTest 在同一进程内驱动真实页面脚本。
+
+每个模拟会话是一个独立的 AppTest 实例，在自己的线程里按脚本操作页面（拖动滑块、
+提交表单、添加投注并保存），所有会话共享本进程的缓存和写入服务，与一个服务器进程
+同时服务多个用户的情况一致。对每个并发数 N 报告 rerun 延迟的 p50/p99、吞吐量和
+每个会话带来的内存增长：测量前先把每个页面完整操作一遍，排除导入等一次性开销，
+再用所有会话仍然存活时的进程 RSS 减去开始前的 RSS，除以 N::
+
+    python benchmarks/loadtest.py                       # 默认 N = 1,2,4,8,16，三个页面都测
+    python benchmarks/loadtest.py --sessions 1,8,32 --page 02 --rounds 10
+    python benchmarks/loadtest.py --output loadtest.json
+
+页面 02 保存的数据写在临时目录中，不会影响仓库里的记录文件。
+
+注意：AppTest 的每次操作都是完整的页面 rerun，不区分 ``st.fragment``。真实服务器上
+页面 00 的滑块、页面 01 的滑块和单选框只重跑所在的 fragment，这里测到的是它们触发
+完整 rerun 时的延迟，是上限而不是用户实际感受到的延迟。
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import gc
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cashflow")
+sys.path.insert(0, APP_DIR)
+
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+TESTED_STREAMLIT = "1.66"
+
+
+def share_process_state():
+    """让多个 AppTest 实例可以在线程中并发运行。
+
+    AppTest 是为单个测试设计的，这里需要调整三处进程级状态，依赖的都是 streamlit 的
+    内部接口（在 streamlit 1.66 上测试），接口不存在时直接报错退出：
+
+    1. AppTest 每次 rerun 都新建 ScriptCache 并重新编译页面脚本，而真实服务器整个进程共用一个。
+       让所有会话共用同一个缓存，既与服务器一致，也避免多个线程同时编译脚本
+       （CPython 3.11 并发编译会报 "AST constructor recursion depth mismatch"）。
+    2. 每次 rerun 结束时 AppTest 会把 global.appTest 恢复成运行前的值，会影响仍在运行的其他会话；
+       预先打开该选项，恢复后的值就始终是 True。
+    3. AppTest 每次 rerun 开始时把新建的 mock 运行时赋给 Runtime._instance，结束时置为 None，
+       其他仍在运行的会话随即找不到运行时。改为只保留第一个 mock 运行时供所有会话共用，
+       相当于一个服务器进程里的单个 Runtime。
+    """
+    try:
+        from streamlit import config
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+        from streamlit.testing.v1 import app_test, local_script_runner
+
+        missing = [
+            name for owner, name in (
+                (app_test, "ScriptCache"), (app_test, "Runtime"),
+                (local_script_runner, "ScriptCache"), (Runtime, "_instance"),
+            )
+            if not hasattr(owner, name)
+        ]
+        config.get_option("global.appTest")
+    except (ImportError, RuntimeError) as exc:
+        missing = [str(exc)]
+    if missing:
+        raise SystemExit(
+            f"负载测试依赖的 streamlit 内部接口不存在：{', '.join(missing)}。"
+            f"当前 streamlit {streamlit.__version__}，已测试的版本为 {TESTED_STREAMLIT}。"
+        )
+
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    config.set_option("global.appTest", True)
+
+    class KeepFirstRuntime(type):
+        def __setattr__(cls, name, value):
+            if name != "_instance":
+                super().__setattr__(name, value)
+            elif value is not None and Runtime._instance is None:
+                Runtime._instance = value
+
+    app_test.Runtime = KeepFirstRuntime("SharedRuntime", (Runtime,), {})
+
+
+PAGES = {
+    "00": os.path.join(APP_DIR, "00.py"),
+    "01": os.path.join(APP_DIR, "pages", "01.py"),
+    "02": os.path.join(APP_DIR, "pages", "02.py"),
+}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def rss_bytes():
+    """当前进程的常驻内存；非 Linux 系统退回到峰值 RSS。"""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def settled_rss_bytes():
+    """回收垃圾并把空闲堆内存还给系统后的 RSS，只反映仍然存活的对象。"""
+    gc.collect()
+    try:
+        ctypes.CDLL(ctypes.util.find_library("c")).malloc_trim(0)  # 仅 glibc 提供
+    except (OSError, AttributeError, TypeError):
+        pass
+    return rss_bytes()
+
+
+def _button(elements, label):
+    return next(b for b in elements.button if b.label == label)
+
+
+class Session:
+    """一个模拟用户：记录自己每次 rerun 的耗时。"""
+
+    def __init__(self, page, seed, timeout):
+        self.at = AppTest.from_file(PAGES[page], default_timeout=timeout)
+        self.rng = random.Random(seed)
+        self.latencies = []
+
+    def run(self, element=None):
+        start = time.perf_counter()
+        (element or self.at).run()
+        self.latencies.append(time.perf_counter() - start)
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+
+def script_00(session):
+    at = session.at
+    at.slider[0].set_value(session.rng.choice([0.03, 0.05, 0.07, 0.1]))
+    session.run()
+    at.slider[1].set_value(session.rng.randint(5, 40))
+    session.run()
+    at.number_input(key="salary_input").set_value(session.rng.randrange(5000, 30000, 500))
+    at.number_input(key="expenses_input").set_value(session.rng.randrange(2000, 15000, 500))
+    session.run(_button(at, "更新财务状况").click())
+
+
+def script_01(session):
+    at = session.at
+    inputs = at.sidebar.number_input
+    inputs[0].set_value(session.rng.randrange(2000, 20000, 500))
+    inputs[2].set_value(session.rng.randrange(0, 5000, 100))
+    inputs[3].set_value(session.rng.randrange(1000, 10000, 100))
+    session.run(_button(at.sidebar, "更新财务数据").click())
+    at.slider[0].set_value(session.rng.randint(1, 120))
+    session.run()
+    at.radio[0].set_value(session.rng.choice(["股票", "自住房"]))
+    session.run()
+
+
+def script_02(session):
+    at = session.at
+    sidebar = at.sidebar
+    sidebar.number_input[0].set_value(round(session.rng.uniform(1.1, 5.0), 2))
+    sidebar.number_input[1].set_value(session.rng.randint(10, 500))
+    sidebar.selectbox[1].set_value(session.rng.choice(["未开奖", "胜", "平", "负"]))
+    session.run(_button(sidebar, "添加记录").click())
+    session.run(_button(sidebar, "保存数据").click())
+
+
+SCRIPTS = {"00": script_00, "01": script_01, "02": script_02}
+
+
+def warm_up(page, timeout):
+    """在测量前把页面完整操作一遍：导入、编译脚本和首次构建缓存都是一次性的进程开销。"""
+    session = Session(page, seed=-1, timeout=timeout)
+    session.run()
+    SCRIPTS[page](session)
+
+
+def run_level(page, sessions, rounds, timeout):
+    """用 ``sessions`` 个并发会话各执行 ``rounds`` 轮交互，返回统计结果。"""
+    opened = threading.Barrier(sessions)
+    done = threading.Barrier(sessions + 1)  # 所有会话完成后等主线程采样内存再退出
+
+    def user(index):
+        try:
+            session = Session(page, seed=index, timeout=timeout)
+            session.run()  # 首次打开页面
+            opened.wait()
+            for _ in range(rounds):
+                SCRIPTS[page](session)
+            done.wait()
+            return session
+        except BaseException:
+            # 一个会话失败时放开其他会话和主线程，错误从 future.result() 抛出
+            opened.abort()
+            done.abort()
+            raise
+
+    rss_before = settled_rss_bytes()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(user, index) for index in range(sessions)]
+        try:
+            done.wait()
+        except threading.BrokenBarrierError:
+            pass
+        elapsed = time.perf_counter() - start
+        rss_after = settled_rss_bytes()  # 所有会话仍然存活
+        finished = [future.result() for future in futures]
+
+    latencies = [t for session in finished for t in session.latencies]
+    return {
+        "page": page,
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": len(latencies) / elapsed,
+        "memory_per_session_mb": (rss_after - rss_before) / sessions / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cashflow 多会话负载测试")
+    parser.add_argument("--page", choices=sorted(PAGES), action="append",
+                        help="要测试的页面，可重复指定（默认全部）")
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="并发会话数，逗号分隔")
+    parser.add_argument("--rounds", type=int, default=5, help="每个会话执行交互脚本的轮数")
+    parser.add_argument("--timeout", type=float, default=60, help="单次 rerun 的超时秒数")
+    parser.add_argument("--output", help="把结果保存为 JSON")
+    args = parser.parse_args()
+
+    pages = args.page or sorted(PAGES)
+    levels = [int(n) for n in args.sessions.split(",") if n]
+    output = os.path.abspath(args.output) if args.output else None
+    results = []
+    share_process_state()
+    workdir = tempfile.mkdtemp(prefix="cashflow-loadtest-")
+    os.chdir(workdir)  # 页面 02 的记录文件写在这里
+
+    print(f"{'页面':<6}{'会话数':>8}{'rerun次数':>10}{'p50 ms':>10}{'p99 ms':>10}{'rerun/s':>10}{'MB/会话':>10}")
+    for page in pages:
+        warm_up(page, args.timeout)
+        for sessions in levels:
+            result = run_level(page, sessions, args.rounds, args.timeout)
+            results.append(result)
+            print(f"{page:<6}{sessions:>8}{result['reruns']:>10}{result['p50_ms']:>10.1f}"
+                  f"{result['p99_ms']:>10.1f}{result['throughput_rps']:>10.1f}{result['memory_per_session_mb']:>10.2f}")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
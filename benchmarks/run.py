@@ -0,0 +1,231 @@
+"""模拟内核和投注记录操作的基准测试，无需浏览器即可运行。
+
+每个用例至少计时 ``--repeat`` 次、累计至少 ``--min-time`` 秒，取最小值，再在 tracemalloc 下
+单独运行一次记录峰值内存。结果可以保存为基线，之后的运行与基线比较：耗时或峰值内存
+同时超过比例阈值和绝对噪声下限（``--noise-floor-ms`` / ``--noise-floor-mb``）才视为性能回退::
+
+    python benchmarks/run.py --save-baseline          # 生成 / 更新 benchmarks/baseline.json
+    python benchmarks/run.py                          # 与基线比较，回退时退出码为 1
+    python benchmarks/run.py --sizes 1000 -k ledger   # 只运行名称包含 ledger 的小规模用例
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cashflow"))
+
+import numpy as np
+import pandas as pd
+
+import ledger
+import ledger_store
+import simulation
+from metrics import financial_metrics
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+LEDGER_OPS = ("append", "profit", "groupby", "save_json", "load_json", "export_csv")
+
+YEARS_GRID = (10, 30, 50)
+RETURN_GRID = (0.0, 0.03, 0.07, 0.12, 0.20)
+INVESTMENT_GRID = (0, 500, 1000, 5000)
+TARGET_GRID = (1000, 10000, 50000)
+
+
+def synthetic_bets(n, seed=0):
+    """生成 ``n`` 条随机投注记录，列与页面中的记录一致。"""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, n), unit="D")
+    return pd.DataFrame({
+        "日期": dates.strftime("%Y-%m-%d"),
+        "比赛": np.char.add("主队 vs 客队 #", rng.integers(0, 500, n).astype(str)),
+        "投注类型": rng.choice(["胜", "平", "负"], n),
+        "赔率": rng.uniform(1.01, 6.0, n).round(2),
+        "投注金额": rng.integers(1, 1000, n),
+        "结果": rng.choice(["未开奖", "胜", "平", "负"], n),
+    }, columns=ledger.COLUMNS)
+
+
+def simulation_cases():
+    def growth_grid():
+        for years in YEARS_GRID:
+            for rate in RETURN_GRID:
+                for investment in INVESTMENT_GRID:
+                    simulation.growth_curve(years, rate / 12, investment)
+
+    def target_grid():
+        for rate in RETURN_GRID:
+            for investment in INVESTMENT_GRID:
+                for target in TARGET_GRID:
+                    simulation.years_to_target(rate, investment, target)
+
+    yield "simulation.growth_curve[grid]", growth_grid
+    yield "simulation.years_to_target[grid]", target_grid
+
+
+def metrics_cases(sizes, wanted):
+    for n in sizes:
+        if not wanted(f"metrics.financial_metrics[{n}]"):
+            continue
+        rng = np.random.default_rng(n)
+        profiles = rng.integers(0, 50_000, size=(n, 6)).tolist()
+
+        def batch(profiles=profiles):
+            for profile in profiles:
+                financial_metrics(*profile)
+
+        yield f"metrics.financial_metrics[{n}]", batch
+
+
+def ledger_cases(sizes, workdir, wanted):
+    for n in sizes:
+        # 构造大规模数据本身就很耗时，只为被选中的规模准备
+        if not any(wanted(f"ledger.{op}[{n}]") for op in LEDGER_OPS):
+            continue
+        data = synthetic_bets(n)
+        with_profit = ledger.with_profit(data)
+        with_profit["赔率区间"] = ledger.odds_range(with_profit)
+        json_path = os.path.join(workdir, f"ledger_{n}.json")
+        records = json.loads(data.to_json(orient="records", date_format="iso"))
+        ledger_store.atomic_write(json_path, records)
+
+        def append(data=data):
+            # 与页面添加记录相同：每次把一行 concat 到已有记录后面
+            df = data
+            for _ in range(100):
+                row = pd.DataFrame({"日期": ["2024-01-01"], "比赛": ["主队 vs 客队"], "投注类型": ["胜"],
+                                    "赔率": [2.0], "投注金额": [100], "结果": ["未开奖"]})
+                df = pd.concat([df, row], ignore_index=True)
+
+        def profit(data=data):
+            ledger.with_profit(data)
+
+        def groupby(df=with_profit):
+            ledger.performance_by(df, "投注类型")
+            ledger.performance_by(df, "赔率区间")
+
+        def save(data=data, path=json_path):
+            ledger_store.atomic_write(path, json.loads(data.to_json(orient="records", date_format="iso")))
+
+        def load(path=json_path):
+            pd.DataFrame.from_records(ledger_store.read_records(path), columns=ledger.COLUMNS)
+
+        def export(df=with_profit, path=os.path.join(workdir, f"ledger_{n}.csv")):
+            df.to_csv(path, index=False)
+
+        for op, func in zip(LEDGER_OPS, (append, profit, groupby, save, load, export)):
+            yield f"ledger.{op}[{n}]", func
+
+
+def measure(func, repeat, min_time):
+    # 快速用例多运行几次，直到累计耗时足够长，最小值才稳定
+    timings = []
+    while len(timings) < repeat or sum(timings) < min_time:
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(timings), "peak_bytes": peak, "runs": len(timings)}
+
+
+def compare(results, baseline, threshold, floors):
+    """返回超过阈值的回退列表：(用例, 指标, 基线值, 当前值)。
+
+    增量必须同时超过基线的 ``threshold`` 比例和 ``floors[指标]`` 的绝对值，
+    毫秒级用例的调度抖动不会被当作回退。
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, floor in floors.items():
+            increase = result[metric] - base[metric]
+            if increase > base[metric] * threshold and increase > floor:
+                regressions.append((name, metric, base[metric], result[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cashflow 基准测试")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES),
+                        help="投注记录规模，逗号分隔（默认 1000,100000,1000000）")
+    parser.add_argument("-k", dest="keyword", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例最少计时次数，取最小值")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每个用例最少累计计时秒数（默认 0.5）")
+    parser.add_argument("--baseline", default=BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写入基线文件")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许的回退比例（默认 0.25 即 25%%）")
+    parser.add_argument("--noise-floor-ms", type=float, default=2.0,
+                        help="耗时增量低于该毫秒数时不算回退（默认 2）")
+    parser.add_argument("--noise-floor-mb", type=float, default=1.0,
+                        help="峰值内存增量低于该 MB 数时不算回退（默认 1）")
+    parser.add_argument("--output", help="把本次结果另存为 JSON")
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.sizes.split(",") if n]
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        def wanted(name):
+            return args.keyword in name
+
+        # 逐个生成用例，未选中的规模不会构造数据
+        cases = itertools.chain(simulation_cases(), metrics_cases(sizes, wanted), ledger_cases(sizes, workdir, wanted))
+        for name, func in cases:
+            if not wanted(name):
+                continue
+            results[name] = measure(func, args.repeat, args.min_time)
+            print(f"{name:<40} {results[name]['seconds'] * 1000:>12.2f} ms {results[name]['peak_bytes'] / 1024 / 1024:>10.2f} MB")
+
+    report = {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as fh:
+                baseline = json.load(fh)
+        # 只运行了部分用例时保留基线中其他用例的结果
+        merged = {**baseline.get("results", {}), **results}
+        baseline.update(report)
+        baseline["results"] = merged
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(baseline, fh, indent=2, ensure_ascii=False)
+        print(f"基线已保存到 {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("没有基线文件，使用 --save-baseline 生成")
+        return 0
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)["results"]
+    floors = {"seconds": args.noise_floor_ms / 1000, "peak_bytes": args.noise_floor_mb * 1024 * 1024}
+    regressions = compare(results, baseline, args.threshold, floors)
+    for name, metric, before, after in regressions:
+        print(f"回退: {name} {metric} {before:.4g} -> {after:.4g} ({after / before - 1:+.0%})")
+    if not regressions:
+        print(f"与基线相比没有超过 {args.threshold:.0%} 的回退")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,18 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
+from figure_cache import cached_figure, cached_result
+import profiling
+import simulation
+import warmup
+import history
+
+# numpy / pandas / plotly（包括依赖 numpy 的 drawdown）在用到的函数内按需导入，
+# 并由 warmup 在后台线程中提前加载
 
 # 设置页面配置
 st.set_page_config(page_title="Optimized CASHFLOW Simulator", layout="wide")
+warmup.start()
 st.title("Optimized CASHFLOW Simulator: 掌握财务自由之道")
+profiler = profiling.start("00")
 
 # 初始化会话状态
 if 'salary' not in st.session_state:
@@ -29,21 +35,92 @@ if 'monthly_investment' not in st.session_state:
 # 侧边栏 - 财务目标设置
 st.sidebar.header("设置你的财务目标")
 target_passive_income = st.sidebar.number_input("目标月被动收入", min_value=0, value=10000, step=500)
+profile = st.sidebar.text_input("快照档案名称", help=history.PROFILE_HELP)
+
+# 图表和计算按输入值缓存，所有会话共享
+@cached_figure
+def income_pie(salary, passive_income):
+    import pandas as pd
+    import plotly.express as px
+
+    income_df = pd.DataFrame({
+        'Category': ['工资收入', '被动收入'],
+        'Amount': [salary, passive_income]
+    })
+    return px.pie(income_df, values='Amount', names='Category', title='收入构成')
+
+@cached_figure
+def cash_flow_waterfall(total_income, expenses, cash_flow):
+    import plotly.graph_objects as go
+
+    fig_cash_flow = go.Figure(go.Waterfall(
+        name = "现金流", orientation = "v",
+        measure = ["relative", "relative", "total"],
+        x = ["总收入", "总支出", "现金流"],
+        textposition = "outside",
+        text = [f"+${total_income}", f"-${expenses}", f"${cash_flow}"],
+        y = [total_income, -expenses, cash_flow],
+        connector = {"line":{"color":"rgb(63, 63, 63)"}},
+    ))
+    fig_cash_flow.update_layout(title="现金流瀑布图")
+    return fig_cash_flow
+
+@cached_figure
+def growth_figure(simulation_years, rate_monthly, monthly_investment):
+    import plotly.graph_objects as go
 
-# 主要内容区域
-tab1, tab2, tab3 = st.tabs(["当前财务状况", "财务模拟", "学习资源"])
+    years = list(range(simulation_years + 1))
+    values = simulation.growth_curve(simulation_years, rate_monthly, monthly_investment)
+
+    fig_growth = go.Figure()
+    fig_growth.add_trace(go.Scatter(x=years, y=values, mode='lines', name='投资价值'))
+    fig_growth.add_trace(go.Scatter(x=years, y=[monthly_investment * 12 * year for year in years], mode='lines', name='总投资金额'))
+    fig_growth.update_layout(title="投资增长曲线", xaxis_title="年数", yaxis_title="价值")
+    return fig_growth
+
+years_to_target = cached_result(simulation.years_to_target)
+
+@cached_result
+def simulate_drawdown(portfolio, withdrawal, inflation, years, returns=None, mean=0.07, volatility=0.15, paths=50_000):
+    import drawdown
+
+    return drawdown.simulate(portfolio, withdrawal, inflation, years, returns=returns,
+                             mean=mean, volatility=volatility, paths=paths)
+
+@cached_figure
+def drawdown_figure(bands):
+    import plotly.graph_objects as go
+
+    low, median, high = bands
+    years = list(range(len(median)))
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=years, y=high, line=dict(width=0), showlegend=False, hoverinfo="skip"))
+    fig.add_trace(go.Scatter(x=years, y=low, fill="tonexty", fillcolor="rgba(31, 119, 180, 0.2)", line=dict(width=0), name="10%-90%区间"))
+    fig.add_trace(go.Scatter(x=years, y=median, mode="lines", name="中位数"))
+    fig.update_layout(title="提取期资产余额", xaxis_title="年数", yaxis_title="资产余额")
+    return fig
+
+# 各标签页作为独立片段（fragment）运行：与某个片段内的控件交互时，
+# 只重新运行并发送该片段，其他标签页和静态内容保持不变
+@st.fragment
+@profiling.timed("当前财务状况")
+def current_status(profile):
+    profiler = profiling.current()
+    # 输入放在表单里，填完所有字段后一次性提交，避免每次按键都重新运行
+    with st.form("financial_status"):
+        in1, in2, in3, in4, in5 = st.columns(5)
+        salary = in1.number_input("工资收入", min_value=0, value=st.session_state.salary, step=100, key="salary_input")
+        passive_income = in2.number_input("被动收入", min_value=0, value=st.session_state.passive_income, step=100, key="passive_income_input")
+        expenses = in3.number_input("总支出", min_value=0, value=st.session_state.expenses, step=100, key="expenses_input")
+        liabilities = in4.number_input("每月债务还款总额", min_value=0, value=st.session_state.liabilities, step=1000, key="liabilities_input")  # 添加负债输入框
+        cash = in5.number_input("现金", min_value=0, value=st.session_state.cash, step=1000, key="cash_input")
+        st.form_submit_button("更新财务状况")
 
-with tab1:
     col1, col2, col3 = st.columns(3)
 
     # 收入支出表
     with col1:
         st.subheader("收入支出表")
-        salary = st.number_input("工资收入", min_value=0, value=st.session_state.salary, step=100, key="salary_input")
-        passive_income = st.number_input("被动收入", min_value=0, value=st.session_state.passive_income, step=100, key="passive_income_input")
-        expenses = st.number_input("总支出", min_value=0, value=st.session_state.expenses, step=100, key="expenses_input")
-        liabilities = st.number_input("每月债务还款总额", min_value=0, value=st.session_state.liabilities, step=1000, key="liabilities_input")  # 添加负债输入框
-        
         total_income = salary + passive_income
         cash_flow = total_income - expenses
         
@@ -60,8 +137,6 @@ with tab1:
     # 应急基金
     with col2:
         st.subheader("应急基金")
-        cash = st.number_input("现金", min_value=0, value=st.session_state.cash, step=1000, key="cash_input")
-        
         months_of_expenses = cash / expenses if expenses > 0 else float('inf')
         st.metric("应急基金", f"{months_of_expenses:.1f} 个月", delta=months_of_expenses - 6)
         
@@ -96,6 +171,17 @@ with tab1:
         else:
             st.info(f"你还需要增加 ${expenses - passive_income:.2f} 的月被动收入来实现财务自由。")
 
+    # 保存本月快照；这个页面没有资产和负债余额（这里的负债是每月还款额），
+    # 资产、负债和净资产留空，历史趋势中不显示净资产
+    history.record(profile, "00", {
+        "income": total_income,
+        "expenses": expenses,
+        "cash": cash,
+        "savings_rate": savings_rate,
+        "debt_to_income": debt_to_income_ratio,
+        "passive_income_ratio": passive_income_ratio,
+    })
+
     # 财务健康指标界定注释
     st.markdown("---")
     st.write("**财务健康指标界定注释**:")
@@ -113,26 +199,11 @@ with tab1:
 
     with col4:
         # 收入构成饼图
-        income_df = pd.DataFrame({
-            'Category': ['工资收入', '被动收入'],
-            'Amount': [salary, passive_income]
-        })
-        fig_income = px.pie(income_df, values='Amount', names='Category', title='收入构成')
-        st.plotly_chart(fig_income, use_container_width=True)
+        profiler.plotly_chart("收入构成", income_pie(salary, passive_income), use_container_width=True)
 
     with col5:
         # 现金流瀑布图
-        fig_cash_flow = go.Figure(go.Waterfall(
-            name = "现金流", orientation = "v",
-            measure = ["relative", "relative", "total"],
-            x = ["总收入", "总支出", "现金流"],
-            textposition = "outside",
-            text = [f"+${total_income}", f"-${expenses}", f"${cash_flow}"],
-            y = [total_income, -expenses, cash_flow],
-            connector = {"line":{"color":"rgb(63, 63, 63)"}},
-        ))
-        fig_cash_flow.update_layout(title="现金流瀑布图")
-        st.plotly_chart(fig_cash_flow, use_container_width=True)
+        profiler.plotly_chart("现金流瀑布图", cash_flow_waterfall(total_income, expenses, cash_flow), use_container_width=True)
 
     # 财务自由进度
     financial_freedom_progress = passive_income / expenses if expenses > 0 else 0
@@ -140,7 +211,22 @@ with tab1:
     st.progress(financial_freedom_progress)
     st.write(f"你的被动收入已经覆盖了 {financial_freedom_progress:.2%} 的支出")
 
-with tab2:
+    # 更新会话状态
+    st.session_state.salary = salary
+    st.session_state.passive_income = passive_income
+    st.session_state.expenses = expenses
+    st.session_state.cash = cash
+    st.session_state.liabilities = liabilities  # 更新负债值
+
+    # 历史趋势放在同一个片段里：提交表单保存快照后，趋势随片段一起刷新
+    st.markdown("---")
+    history.render_history(profile, "00")
+
+
+@st.fragment
+@profiling.timed("财务模拟")
+def financial_simulation(target_passive_income):
+    profiler = profiling.current()
     st.header("财务模拟")
     
     col1, col2 = st.columns(2)
@@ -168,37 +254,13 @@ with tab2:
         st.metric("投资回报", f"${future_value - total_investment:,.2f}")
 
     # 投资增长曲线
-    years = list(range(simulation_years + 1))
-    values = []
-    current_value = 0
-    for year in years:
-        for month in range(12):
-          current_value = current_value * (1 + rate_monthly) + monthly_investment
-
-        values.append(current_value)
-    
-    
-    fig_growth = go.Figure()
-    fig_growth.add_trace(go.Scatter(x=years, y=values, mode='lines', name='投资价值'))
-    fig_growth.add_trace(go.Scatter(x=years, y=[monthly_investment * 12 * year for year in years], mode='lines', name='总投资金额'))
-    fig_growth.update_layout(title="投资增长曲线", xaxis_title="年数", yaxis_title="价值")
-    st.plotly_chart(fig_growth, use_container_width=True)
+    with profiler.section("增长曲线计算"):
+        fig_growth = growth_figure(simulation_years, rate_monthly, monthly_investment)
+    profiler.plotly_chart("投资增长曲线", fig_growth, use_container_width=True)
 
     # 计算实现财务目标所需时间
-    years_to_passive_income = 0
-    total_investment_value = 0
-    monthly_rate = investment_return / 12
-
-    for year in range(1, 101):  # 最多模拟100年
-        for month in range(12):
-            total_investment_value = (total_investment_value + monthly_investment) * (1 + monthly_rate)
-        
-        annual_passive_income = total_investment_value * investment_return
-        monthly_passive_income = annual_passive_income / 12
-
-        if monthly_passive_income >= target_passive_income and years_to_passive_income == 0:
-            years_to_passive_income = year
-            break
+    with profiler.section("目标时间计算"):
+        years_to_passive_income = years_to_target(investment_return, monthly_investment, target_passive_income)
 
     st.subheader("实现财务目标所需时间")
     if years_to_passive_income > 0:
@@ -206,7 +268,93 @@ with tab2:
     else:
         st.write("以当前增长率，无法在100年内达到目标被动收入")
 
+    # 更新会话状态
+    st.session_state.investment_return = investment_return
+    st.session_state.simulation_years = simulation_years
+    st.session_state.monthly_investment = monthly_investment
+
+
+@st.fragment
+@profiling.timed("提取模拟")
+def drawdown_simulation(target_passive_income):
+    import drawdown
+
+    profiler = profiling.current()
+    st.header("提取阶段模拟")
+    st.write("财务自由后每年按通胀调整提取生活费，检验资产能否经受收益波动和收益顺序风险。")
+
+    # 年均收益率沿用“财务模拟”中的设置，初始资产默认取按该收益率能产生目标被动收入的金额
+    # 默认值只在首次显示时写入；控件使用固定的 key，其他输入变化时不会丢掉用户填写的值
+    investment_return = st.session_state.investment_return
+    if "drawdown_portfolio" not in st.session_state:
+        st.session_state.drawdown_portfolio = int(target_passive_income * 12 / investment_return) if investment_return > 0 else 0
+    if "drawdown_annual_expenses" not in st.session_state:
+        st.session_state.drawdown_annual_expenses = st.session_state.expenses * 12
+
+    with st.form("drawdown"):
+        col1, col2 = st.columns(2)
+        with col1:
+            portfolio = st.number_input("初始资产", min_value=0, step=10000, key="drawdown_portfolio")
+            annual_expenses = st.number_input("首年提取金额（年支出）", min_value=0, step=1000, key="drawdown_annual_expenses")
+            inflation = st.slider("年通胀率", min_value=0.0, max_value=0.10, value=0.03, step=0.005, format="%.3f")
+            years = st.slider("提取年数", min_value=5, max_value=60, value=40)
+        with col2:
+            mode = st.radio("收益路径", ["随机收益", "历史滚动窗口"], horizontal=True)
+            volatility = st.slider("年收益波动率", min_value=0.0, max_value=0.40, value=0.15, step=0.01, format="%.2f")
+            paths = st.select_slider("模拟路径数", options=[10_000, 20_000, 50_000, 100_000], value=50_000)
+            history_file = st.file_uploader("历史年度收益率（CSV，第一列为小数形式的年收益率）", type="csv")
+        st.caption(f"随机收益的年均收益率取自“财务模拟”中的设置：{investment_return:.2%}")
+        st.form_submit_button("运行提取模拟")
+
+    if portfolio <= 0:
+        st.warning("初始资产为0，无法进行提取模拟。")
+        return
+
+    returns = None
+    if mode == "历史滚动窗口":
+        if history_file is None:
+            st.info("请上传历史年度收益率CSV文件。")
+            return
+        import pandas as pd
+
+        history_returns = pd.to_numeric(pd.read_csv(history_file, header=None).iloc[:, 0], errors="coerce").dropna()
+        if history_returns.empty:
+            st.error("CSV文件中没有有效的收益率数据。")
+            return
+        returns = drawdown.rolling_windows(history_returns.to_numpy(), years)
+
+    with profiler.section("提取路径计算"):
+        result = simulate_drawdown(portfolio, annual_expenses, inflation, years, returns=returns,
+                                   mean=investment_return, volatility=volatility, paths=paths)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("成功率", f"{result['success_rate']:.1%}")
+    col2.metric("计划提取率", f"{result['withdrawal_rate']:.2%}")
+    col3.metric("安全提取率（95%成功）", f"{result['safe_withdrawal_rates'][0.95]:.2%}")
+    if result['success_rate'] >= 0.95:
+        st.success(f"在{result['paths']:,}条收益路径中，资产能支撑{years}年提取的比例达到{result['success_rate']:.1%}。")
+    else:
+        st.warning(f"有{1 - result['success_rate']:.1%}的收益路径在{years}年内耗尽资产，考虑降低提取率或增加初始资产。")
+
+    st.write("不同成功率要求下的安全提取率：" + "，".join(
+        f"{confidence:.0%}：{rate:.2%}" for confidence, rate in result['safe_withdrawal_rates'].items()
+    ))
+    bands = [result['balance_bands'][p].tolist() for p in drawdown.PERCENTILES]
+    profiler.plotly_chart("提取期资产余额", drawdown_figure(bands), use_container_width=True)
+
+# 主要内容区域
+tab1, tab2, tab3, tab4 = st.tabs(["当前财务状况", "财务模拟", "提取模拟", "学习资源"])
+
+with tab1:
+    current_status(profile)
+
+with tab2:
+    financial_simulation(target_passive_income)
+
 with tab3:
+    drawdown_simulation(target_passive_income)
+
+with tab4:
     st.header("学习资源")
     
     st.subheader("财务知识小贴士")
@@ -257,16 +405,8 @@ st.write("""
 7. **生活方式设计**: 财务自由不仅仅是关于金钱，也是关于设计你想要的生活方式。平衡当前的生活质量和未来的财务安全。
 """)
 
-# 更新会话状态
-st.session_state.salary = salary
-st.session_state.passive_income = passive_income
-st.session_state.expenses = expenses
-st.session_state.cash = cash
-st.session_state.liabilities = liabilities  # 更新负债值
-st.session_state.investment_return = investment_return
-st.session_state.simulation_years = simulation_years
-st.session_state.monthly_investment = monthly_investment
-
 # 添加页脚
 st.markdown("---")
-st.write("注意：这个模拟器仅用于教育目的。请在做出任何重大财务决策之前咨询专业的财务顾问。")
\ No newline at end of file
+st.write("注意：这个模拟器仅用于教育目的。请在做出任何重大财务决策之前咨询专业的财务顾问。")
+
+profiler.finish()
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""跨会话共享的图表 / 计算结果缓存。
+
+缓存是进程级的：所有会话、所有页面共用同一份，按函数和输入参数取值。
+图表保存为 ``fig.to_dict()`` 的普通字典规格，计算结果保存为对象本身，都以 pickle
+字节存放；每次调用都返回一个新的副本，调用方可以直接在返回的图表字典上追加 trace。
+图表字典用 ``as_figure`` 转换成 Figure 后再交给 ``st.plotly_chart``
+（``profiling.RerunProfiler.plotly_chart`` 会自动转换）。
+
+名称以下划线开头的参数不参与缓存键（与 ``st.cache_data`` 的约定相同），
+用于传入哈希代价很高、已经由其他参数（例如数据版本号）确定内容的大 DataFrame。
+
+缓存有总字节数上限和 TTL，超出上限时按 LRU 淘汰；``stats()`` 返回命中率和容量统计。
+上限和 TTL 可以通过环境变量 ``CASHFLOW_CACHE_MAX_MB`` / ``CASHFLOW_CACHE_TTL`` 调整。
+"""
+
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+
+class FigureCache:
+    """线程安全的 LRU + TTL 缓存，值为字节串，按字节数限制总容量。"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (过期时间, 字节串)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """返回缓存的字节串；不存在或已过期时返回 None。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        """保存字节串；单个值超过容量上限时不缓存。"""
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, payload)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+
+default_cache = FigureCache(
+    max_bytes=int(float(os.environ.get("CASHFLOW_CACHE_MAX_MB", "64")) * 1024 * 1024),
+    ttl=float(os.environ.get("CASHFLOW_CACHE_TTL", "3600")),
+)
+
+
+def fingerprint(frame):
+    """DataFrame / Series 内容的哈希摘要（列名、dtype、索引和所有值），内容相同则相同。"""
+    import pandas as pd
+
+    digest = hashlib.sha1(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    columns = tuple(frame.columns) if hasattr(frame, "columns") else (frame.name,)
+    digest.update(repr((tuple(str(c) for c in columns), str(getattr(frame, "dtypes", "")))).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _freeze(value):
+    """把参数转换成可哈希的缓存键；DataFrame / Series / numpy 数组按内容哈希。"""
+    if hasattr(value, "to_numpy") and hasattr(value, "index"):
+        return ("frame", fingerprint(value))
+    if hasattr(value, "tobytes") and hasattr(value, "shape"):
+        return ("array", value.shape, str(value.dtype), hashlib.sha1(value.tobytes()).hexdigest())
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    try:
+        hash(value)
+    except TypeError:
+        raise TypeError(
+            f"无法为 {type(value).__name__} 类型的参数生成缓存键；"
+            "请传入可哈希的值，或把参数名改为下划线开头使其不参与缓存键"
+        ) from None
+    return value
+
+
+def _memoize(encode, decode, cache, prepare=None):
+    def decorator(func):
+        # 页面脚本的模块名都是 __main__，用源文件名区分不同页面里的同名函数
+        func_id = (func.__code__.co_filename, func.__qualname__)
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            target = cache if cache is not None else default_cache
+            arguments = signature.bind(*args, **kwargs).arguments
+            key = (func_id, tuple((name, _freeze(value)) for name, value in arguments.items()
+                                  if not name.startswith("_")))
+            payload = target.get(key)
+            if payload is not None:
+                return decode(payload)
+            result = func(*args, **kwargs)
+            if prepare is not None:
+                result = prepare(result)
+            target.put(key, encode(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _figure_spec(fig):
+    return fig.to_dict()
+
+
+def as_figure(fig):
+    """把缓存返回的图表字典转换成 Figure；已经是 Figure 时原样返回。
+
+    字典来自已经校验过的 Figure，这里跳过 plotly 的逐属性校验：``st.plotly_chart``
+    收到字典时会用 ``Figure(**dict)`` 重新校验，比重新构建图表还慢。
+    """
+    if not isinstance(fig, dict):
+        return fig
+    import plotly.graph_objects as go
+
+    return go.Figure(fig, _validate=False)
+
+
+def cached_figure(func=None, *, cache=None):
+    """缓存返回 Plotly 图表的函数，返回图表的字典规格（``fig.to_dict()``）。"""
+    decorator = _memoize(pickle.dumps, pickle.loads, cache, prepare=_figure_spec)
+    return decorator(func) if func is not None else decorator
+
+
+def cached_result(func=None, *, cache=None):
+    """缓存返回普通计算结果的函数（数值、列表、DataFrame 等可 pickle 的对象）。"""
+    decorator = _memoize(pickle.dumps, pickle.loads, cache)
+    return decorator(func) if func is not None else decorator
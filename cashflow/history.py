@@ -0,0 +1,90 @@
+"""财务快照的页面组件：保存本月快照和显示历史趋势，00 和 01 页面共用。"""
+
+import streamlit as st
+
+import profiling
+import snapshots
+from figure_cache import cached_figure
+
+TREND_LABELS = {
+    "net_worth": "净资产",
+    "savings_rate": "储蓄率",
+    "debt_to_income": "债务收入比",
+    "passive_income_ratio": "被动收入比",
+}
+PROFILE_HELP = "填写后每月自动保存一份财务快照，用于查看历史趋势；留空则不保存"
+
+
+@st.cache_resource
+def get_store():
+    # 每个进程共享同一个快照存储
+    return snapshots.SnapshotStore(snapshots.DEFAULT_PATH)
+
+
+def record(profile, source, values):
+    """档案名称不为空时保存（或更新）本月快照。
+
+    ``values`` 中缺少的字段保存为 NULL。``render_history`` 要和 ``record`` 在同一个
+    片段（或同一次完整运行）里调用，才能显示刚保存的快照。
+    """
+    if profile:
+        get_store().record(profile, source, values)
+
+
+@cached_figure
+def trend_figure(months, series):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=(len(series) + 1) // 2, cols=2, subplot_titles=[TREND_LABELS[field] for field in series])
+    for i, field in enumerate(series):
+        fig.add_trace(
+            go.Scatter(x=months, y=series[field], mode="lines+markers", name=TREND_LABELS[field]),
+            row=i // 2 + 1, col=i % 2 + 1,
+        )
+        if field != "net_worth":
+            fig.update_yaxes(tickformat=".0%", row=i // 2 + 1, col=i % 2 + 1)
+    fig.update_layout(title="财务指标趋势", showlegend=False, height=300 * ((len(series) + 1) // 2))
+    return fig
+
+
+def _format(field, value, signed=False):
+    if value is None:
+        return None
+    if field == "net_worth":
+        return f"{value:+,.0f}" if signed else f"${value:,.0f}"
+    return f"{value:+.2%}" if signed else f"{value:.2%}"
+
+
+def render_history(profile, source):
+    with profiling.current().section("历史趋势"):
+        _render_history(profile, source)
+
+
+def _render_history(profile, source):
+    st.header("历史趋势")
+    if not profile:
+        st.info("在侧边栏填写档案名称后，每月会自动保存一份财务快照并在这里显示趋势。")
+        return
+    rows = get_store().history(profile, source)
+    if not rows:
+        st.info("这个档案还没有快照。")
+        return
+
+    # 只显示这个页面有数据的指标（例如 00 页面没有资产负债余额，不显示净资产）
+    fields = [field for field in snapshots.TRENDS if any(row[field] is not None for row in rows)]
+    if not fields:
+        st.info("这个档案的快照中还没有可显示的指标。")
+        return
+    latest = rows[-1]
+    for col, field in zip(st.columns(len(fields)), fields):
+        col.metric(
+            f"{TREND_LABELS[field]}（环比）",
+            _format(field, latest[field]) or "—",
+            delta=_format(field, latest[f"delta_{field}"], signed=True),
+            delta_color="inverse" if field == "debt_to_income" else "normal",
+        )
+
+    months = [row["month"] for row in rows]
+    series = {field: [row[field] for row in rows] for field in fields}
+    profiling.current().plotly_chart("财务指标趋势", trend_figure(months, series), use_container_width=True)
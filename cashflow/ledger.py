@@ -0,0 +1,51 @@
+"""足彩投资记录的盈亏计算和分组统计，与页面无关，便于缓存和基准测试。"""
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["日期", "比赛", "投注类型", "赔率", "投注金额", "结果"]
+ODDS_BINS = [1, 1.5, 2, 2.5, 3, float('inf')]
+ODDS_LABELS = ['1.0-1.5', '1.5-2.0', '2.0-2.5', '2.5-3.0', '3.0+']
+
+
+def calculate_profit(row):
+    """单条记录的盈亏，与 ``with_profit`` 的向量化计算规则相同。"""
+    if row['结果'] == '未开奖':
+        return 0
+    elif row['结果'] == row['投注类型']:
+        return row['投注金额'] * (row['赔率'] - 1)
+    else:
+        return -row['投注金额']
+
+
+def with_profit(data):
+    """返回带有 '盈亏' 和 '是否盈利' 列的副本，数值列统一转换为数字类型。"""
+    df = data.copy()
+    df['赔率'] = pd.to_numeric(df['赔率'], errors='coerce')
+    df['投注金额'] = pd.to_numeric(df['投注金额'], errors='coerce')
+    # 与 calculate_profit 逐行计算的规则相同，按列向量化计算
+    pending = (df['结果'] == '未开奖').to_numpy()
+    won = (df['结果'] == df['投注类型']).to_numpy()
+    stake = df['投注金额'].to_numpy(dtype=float)
+    odds = df['赔率'].to_numpy(dtype=float)
+    df['盈亏'] = np.select([pending, won], [0.0, stake * (odds - 1)], default=-stake)
+    df['是否盈利'] = df['盈亏'] > 0
+    return df
+
+
+def odds_range(df):
+    return pd.cut(df['赔率'], bins=ODDS_BINS, labels=ODDS_LABELS)
+
+
+def performance_by(df, column):
+    """按 ``column`` 分组统计投注金额、盈亏、胜率和 ROI。"""
+    performance = df.groupby(column).agg({
+        '投注金额': 'sum',
+        '盈亏': 'sum',
+        '是否盈利': 'mean'
+    }).reset_index()
+    performance['ROI'] = performance.apply(
+        lambda row: (row['盈亏'] / row['投注金额'] * 100) if row['投注金额'] != 0 else 0, axis=1
+    )
+    performance['胜率'] = performance['是否盈利'] * 100
+    return performance
@@ -0,0 +1,255 @@
+"""足彩投资记录的单写者持久化服务。
+
+所有会话把写操作放进同一个进程内队列，由后台线程串行落盘：
+- 落盘前获取 ``<文件>.lock`` 上的咨询锁，多个进程之间也不会互相覆盖；
+- 每次都是“读取现有记录 -> 合并 -> 写临时文件 -> os.replace 原子替换”，
+  读者永远看不到写了一半的文件；
+- 队列里积压的多个操作会合并成一次写入，页面脚本线程只负责入队，不等待磁盘。
+
+本模块不依赖 streamlit，可以直接运行做并发压力测试::
+
+    python cashflow/ledger_store.py --stress --writers 16 --records 200
+"""
+
+import argparse
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_APPEND = "append"
+_REPLACE = "replace"
+_FLUSH = "flush"
+
+
+@contextmanager
+def file_lock(lock_path, shared=False):
+    """在 ``lock_path`` 上持有咨询锁（POSIX 用 flock，Windows 用 msvcrt）。"""
+    with open(lock_path, "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            # msvcrt 不支持共享锁，统一按独占锁处理
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_records(path):
+    """读取记录列表；文件不存在时返回 None。"""
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            content = fh.read()
+    except FileNotFoundError:
+        return None
+    return json.loads(content) if content.strip() else []
+
+
+def _new_file_mode():
+    # 普通 open() 新建文件时的权限：0666 去掉 umask 中的位
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+_NEW_FILE_MODE = _new_file_mode()
+
+
+def atomic_write(path, records):
+    """先写同目录下的临时文件并 fsync，再用 os.replace 原子替换目标文件。
+
+    mkstemp 创建的临时文件权限是 0600，替换前改成原文件的权限（新文件则按 umask），
+    与直接写文件时的权限一致。
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(records, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = _NEW_FILE_MODE
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class LedgerWriter:
+    """某个 JSON 记录文件的单写者服务，每个进程每个文件只应创建一个实例。
+
+    ``append`` / ``replace`` 立即返回 ``Future``，调用方可以不等待结果；
+    ``flush`` 会阻塞到此前提交的所有操作都已落盘。
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.lock_path = self.path + ".lock"
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, records):
+        """把 ``records`` 追加到文件末尾，不会覆盖其他会话已保存的记录。"""
+        return self._submit(_APPEND, list(records))
+
+    def replace(self, records):
+        """用 ``records`` 整体替换文件内容（用于清空数据）。"""
+        return self._submit(_REPLACE, list(records))
+
+    def flush(self, timeout=None):
+        """等待此前提交的所有写操作完成。"""
+        return self._submit(_FLUSH, None).result(timeout)
+
+    def read(self):
+        """在共享锁下读取当前文件内容；文件不存在时返回 None。"""
+        with file_lock(self.lock_path, shared=True):
+            return read_records(self.path)
+
+    def close(self, timeout=None):
+        """处理完队列中剩余的操作后停止后台线程。"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _submit(self, kind, payload):
+        future = Future()
+        self._queue.put((kind, payload, future))
+        return future
+
+    def _drain(self, first):
+        # 把已经排队的操作一起取出，合并成一次落盘
+        batch = [first]
+        while True:
+            try:
+                op = self._queue.get_nowait()
+            except queue.Empty:
+                return batch, False
+            if op is None:
+                return batch, True
+            batch.append(op)
+
+    def _run(self):
+        while True:
+            op = self._queue.get()
+            if op is None:
+                return
+            batch, stop = self._drain(op)
+            try:
+                self._apply(batch)
+            except Exception as exc:
+                for _, _, future in batch:
+                    future.set_exception(exc)
+            else:
+                for _, _, future in batch:
+                    future.set_result(None)
+            if stop:
+                return
+
+    def _apply(self, batch):
+        if all(kind == _FLUSH for kind, _, _ in batch):
+            return
+        with file_lock(self.lock_path):
+            records = read_records(self.path) or []
+            for kind, payload, _ in batch:
+                if kind == _APPEND:
+                    records.extend(payload)
+                elif kind == _REPLACE:
+                    records = list(payload)
+            atomic_write(self.path, records)
+
+
+def _stress_worker(path, writer_id, count):
+    writer = LedgerWriter(path)
+    futures = [writer.append([{"writer": writer_id, "seq": seq}]) for seq in range(count)]
+    for future in futures:
+        future.result()
+    writer.close()
+
+
+def stress(path, writers=8, records=100, processes=True):
+    """模拟 ``writers`` 个并发写者各追加 ``records`` 条记录，检查没有记录丢失。
+
+    ``processes=True`` 时每个写者是独立进程（各自的 LedgerWriter，只靠文件锁互斥），
+    否则是同一进程内共享一个 LedgerWriter 的多个线程。
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+    start = time.perf_counter()
+    if processes:
+        import multiprocessing
+
+        workers = [
+            multiprocessing.Process(target=_stress_worker, args=(path, i, records))
+            for i in range(writers)
+        ]
+    else:
+        shared = LedgerWriter(path)
+
+        def _thread_worker(writer_id):
+            for seq in range(records):
+                shared.append([{"writer": writer_id, "seq": seq}])
+
+        workers = [threading.Thread(target=_thread_worker, args=(i,)) for i in range(writers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if not processes:
+        shared.flush()
+        shared.close()
+    elapsed = time.perf_counter() - start
+
+    saved = read_records(path) or []
+    seen = {(r["writer"], r["seq"]) for r in saved}
+    expected = writers * records
+    return {
+        "expected": expected,
+        "saved": len(saved),
+        "unique": len(seen),
+        "lost": expected - len(seen),
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="足彩投资记录持久化服务")
+    parser.add_argument("--stress", action="store_true", help="运行并发写入压力测试")
+    parser.add_argument("--path", default=os.path.join(tempfile.gettempdir(), "ledger_stress.json"))
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--records", type=int, default=100)
+    parser.add_argument("--threads", action="store_true", help="使用线程而不是进程模拟写者")
+    args = parser.parse_args()
+    if not args.stress:
+        parser.print_help()
+        return 0
+    result = stress(args.path, args.writers, args.records, processes=not args.threads)
+    print(json.dumps(result, ensure_ascii=False))
+    return 0 if result["lost"] == 0 and result["saved"] == result["expected"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
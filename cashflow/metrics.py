@@ -0,0 +1,17 @@
+"""富爸爸穷爸爸财务模拟器使用的财务指标计算。"""
+
+
+def financial_metrics(salary, business_income, investment_income, expenses, total_assets, total_liabilities):
+    """根据月收入、月支出和资产负债总额计算关键财务指标，比例以百分数表示。"""
+    total_income = salary + business_income + investment_income
+    passive_income = investment_income + business_income
+    net_income = total_income - expenses
+    return {
+        "total_income": total_income,
+        "passive_income": passive_income,
+        "net_income": net_income,
+        "net_worth": total_assets - total_liabilities,
+        "savings_rate": (total_income - expenses) / total_income * 100 if total_income != 0 else 0,
+        "debt_to_income": total_liabilities / (total_income * 12) * 100 if total_income != 0 else 0,
+        "passive_income_ratio": passive_income / total_income * 100 if total_income != 0 else 0,
+    }
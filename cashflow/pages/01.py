@@ -1,19 +1,26 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-import numpy as np
 import math
+from figure_cache import cached_figure
+import profiling
+from metrics import financial_metrics
+import warmup
+import history
+
+# plotly 在绘图函数内按需导入，并由 warmup 在后台线程中提前加载
 
 # 设置页面配置
 st.set_page_config(page_title="富爸爸穷爸爸财务模拟器", layout="wide")
+warmup.start()
+profiler = profiling.start("01")
 
 # 标题和介绍
 st.title("富爸爸穷爸爸财务模拟器")
 st.write("基于CASHFLOW游戏和《穷爸爸富爸爸》概念的交互式财务管理应用")
 
 # 侧边栏：用户输入
-with st.sidebar:
+# 输入放在表单里，填完所有字段后一次性提交，避免每次按键都重新运行整个页面
+with st.sidebar.form("financial_data"):
     st.header("输入你的财务数据")
 
     # 收入
@@ -36,13 +43,31 @@ with st.sidebar:
     credit_card_debt = st.number_input("信用卡债务", min_value=0, value=0)
     other_debts = st.number_input("其他债务", min_value=0, value=0)
 
+    profile = st.text_input("快照档案名称", help=history.PROFILE_HELP)
+
+    st.form_submit_button("更新财务数据")
+
 # 计算关键财务指标
-total_income = salary + business_income + investment_income
-passive_income = investment_income + business_income
-net_income = total_income - expenses
 total_assets = savings + stocks + real_estate + business_value
 total_liabilities = mortgage + car_loan + credit_card_debt + other_debts
-net_worth = total_assets - total_liabilities
+metrics = financial_metrics(salary, business_income, investment_income, expenses, total_assets, total_liabilities)
+total_income = metrics["total_income"]
+passive_income = metrics["passive_income"]
+net_income = metrics["net_income"]
+net_worth = metrics["net_worth"]
+
+# 保存本月快照，比例类指标按小数保存
+history.record(profile, "01", {
+    "income": total_income,
+    "expenses": expenses,
+    "cash": savings,
+    "assets": total_assets,
+    "liabilities": total_liabilities,
+    "net_worth": net_worth,
+    "savings_rate": metrics["savings_rate"] / 100,
+    "debt_to_income": metrics["debt_to_income"] / 100,
+    "passive_income_ratio": metrics["passive_income_ratio"] / 100,
+})
 
 # 创建财务报表
 # 资产负债表
@@ -81,24 +106,35 @@ with col3:
 # 可视化
 st.header("财务可视化")
 
+# 图表按输入值缓存，所有会话共享
+@cached_figure
+def pie_chart(values, names, title):
+    import plotly.express as px
+
+    return px.pie(values=values, names=names, title=title)
+
 # 收入构成饼图
-fig_income = px.pie(
+fig_income = pie_chart(
     values=[salary, business_income, investment_income],
     names=["工资收入", "事业收入", "投资收入"],
     title="收入构成"
 )
-st.plotly_chart(fig_income)
+profiler.plotly_chart("收入构成", fig_income)
 
 # 资产配置饼图
-fig_assets = px.pie(
+fig_assets = pie_chart(
     values=[savings, stocks, real_estate, business_value],
     names=["储蓄", "股票", "房地产", "事业"],
     title="资产配置"
 )
-st.plotly_chart(fig_assets)
+profiler.plotly_chart("资产配置", fig_assets)
 
 # 现金流象限图
-def cash_flow_quadrant(employee, self_employed, business_owner, investor):
+# 四个象限背景与输入无关，只构建一次；每次只在缓存返回的字典副本上追加“你的位置”标记
+@cached_figure
+def quadrant_backdrop():
+    import plotly.graph_objects as go
+
     fig = go.Figure()
 
     fig.add_trace(go.Scatter(
@@ -164,22 +200,28 @@ def cash_flow_quadrant(employee, self_employed, business_owner, investor):
         height=600
     )
 
+    return fig
+
+def cash_flow_quadrant(employee, self_employed, business_owner, investor):
+    fig = quadrant_backdrop()
+
     total = employee + self_employed + business_owner + investor
     x = (investor - self_employed) / total if total !=0 else 0
     y = (employee - business_owner) / total if total !=0 else 0
 
-    fig.add_trace(go.Scatter(
+    fig["data"].append(dict(
+        type="scatter",
         x=[x], y=[y],
         mode="markers",
-        marker_size=15,
-        marker_color="red",
+        marker=dict(size=15, color="red"),
         name="你的位置"
     ))
 
     return fig
 
-cf_quadrant = cash_flow_quadrant(salary, 0, business_income, investment_income)
-st.plotly_chart(cf_quadrant)
+with profiler.section("现金流象限构建"):
+    cf_quadrant = cash_flow_quadrant(salary, 0, business_income, investment_income)
+profiler.plotly_chart("现金流象限", cf_quadrant)
 
 # 财务健康指标
 st.header("财务健康指标")
@@ -187,15 +229,15 @@ st.header("财务健康指标")
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    savings_rate = (total_income - expenses) / total_income * 100 if total_income != 0 else 0
+    savings_rate = metrics["savings_rate"]
     st.metric("储蓄率", f"{savings_rate:.2f}%")
 
 with col2:
-    debt_to_income = total_liabilities / (total_income * 12) * 100 if total_income != 0 else 0
+    debt_to_income = metrics["debt_to_income"]
     st.metric("债务收入比", f"{debt_to_income:.2f}%")
 
 with col3:
-    passive_income_ratio = passive_income / total_income * 100 if total_income != 0 else 0
+    passive_income_ratio = metrics["passive_income_ratio"]
     st.metric("被动收入比例", f"{passive_income_ratio:.2f}%")
 
 # 财务建议
@@ -224,48 +266,63 @@ assets_liabilities = pd.DataFrame({
     "金额": [total_assets, total_liabilities]
 })
 
-fig_assets_liabilities = px.bar(
-    assets_liabilities,
-    x="类型",
-    y="金额",
-    title="资产与负债比较",
-    color="类型",
-    color_discrete_map={"资产": "green", "负债": "red"}
-)
-st.plotly_chart(fig_assets_liabilities)
+@cached_figure
+def assets_liabilities_bar(assets_liabilities):
+    import plotly.express as px
+
+    return px.bar(
+        assets_liabilities,
+        x="类型",
+        y="金额",
+        title="资产与负债比较",
+        color="类型",
+        color_discrete_map={"资产": "green", "负债": "red"}
+    )
+
+fig_assets_liabilities = assets_liabilities_bar(assets_liabilities)
+profiler.plotly_chart("资产与负债比较", fig_assets_liabilities)
+
+# 历史趋势
+history.render_history(profile, "01")
 
 # 现金流游戏模拟器
-st.header("现金流游戏模拟器")
+# 模拟器和小测验作为独立片段（fragment）运行，调整它们只重新运行各自的部分
+@st.fragment
+@profiling.timed("现金流游戏模拟器")
+def cash_flow_game(passive_income, expenses, total_income, total_liabilities):
+    st.header("现金流游戏模拟器")
 
-st.write("模拟增加被动收入和减少支出对你财务状况的影响")
+    st.write("模拟增加被动收入和减少支出对你财务状况的影响")
 
-col1, col2 = st.columns(2)
+    col1, col2 = st.columns(2)
 
-with col1:
-    additional_passive_income = st.number_input("增加的月被动收入", min_value=0, value=0)
-    reduced_expenses = st.number_input("减少的月支出", min_value=0, max_value=expenses, value=0)
+    with col1:
+        additional_passive_income = st.number_input("增加的月被动收入", min_value=0, value=0)
+        reduced_expenses = st.number_input("减少的月支出", min_value=0, max_value=expenses, value=0)
 
-with col2:
-    months = st.slider("模拟月数", min_value=1, max_value=120, value=12)
+    with col2:
+        months = st.slider("模拟月数", min_value=1, max_value=120, value=12)
 
-new_passive_income = passive_income + additional_passive_income
-new_expenses = expenses - reduced_expenses
-new_net_income = total_income + additional_passive_income - new_expenses
+    new_passive_income = passive_income + additional_passive_income
+    new_expenses = expenses - reduced_expenses
+    new_net_income = total_income + additional_passive_income - new_expenses
 
-months_to_freedom = 0
-if new_passive_income > new_expenses:
-    months_to_freedom = math.ceil((total_liabilities) / (new_passive_income - new_expenses)) if (new_passive_income - new_expenses) != 0 else 0
+    months_to_freedom = 0
+    if new_passive_income > new_expenses:
+        months_to_freedom = math.ceil((total_liabilities) / (new_passive_income - new_expenses)) if (new_passive_income - new_expenses) != 0 else 0
 
-st.write(f"新的月净收入: ${new_net_income}")
-if months_to_freedom > 0:
-    st.write(f"预计达到财务自由所需时间: {months_to_freedom} 个月")
-else:
-    st.write("被动收入尚未超过支出，继续努力增加被动收入或减少支出！")
+    st.write(f"新的月净收入: ${new_net_income}")
+    if months_to_freedom > 0:
+        st.write(f"预计达到财务自由所需时间: {months_to_freedom} 个月")
+    else:
+        st.write("被动收入尚未超过支出，继续努力增加被动收入或减少支出！")
 
-# 财务自由进度条
-financial_freedom_ratio = min(new_passive_income / new_expenses * 100, 100) if new_expenses != 0 else 0
-st.progress(financial_freedom_ratio / 100)
-st.write(f"财务自由进度: {financial_freedom_ratio:.2f}%")
+    # 财务自由进度条
+    financial_freedom_ratio = min(new_passive_income / new_expenses * 100, 100) if new_expenses != 0 else 0
+    st.progress(financial_freedom_ratio / 100)
+    st.write(f"财务自由进度: {financial_freedom_ratio:.2f}%")
+
+cash_flow_game(passive_income, expenses, total_income, total_liabilities)
 
 # 教育资源
 st.header("财务教育资源")
@@ -278,19 +335,26 @@ st.markdown("""
 """)
 
 # 财务知识小测验
-st.header("财务知识小测验")
-q1 = st.radio(
-    "根据《穷爸爸富爸爸》，以下哪项不是资产？",
-    ("股票", "自住房", "租金收入", "版税")
-)
+@st.fragment
+@profiling.timed("财务知识小测验")
+def financial_quiz():
+    st.header("财务知识小测验")
+    q1 = st.radio(
+        "根据《穷爸爸富爸爸》，以下哪项不是资产？",
+        ("股票", "自住房", "租金收入", "版税")
+    )
 
-if q1 == "自住房":
-    st.success("正确！根据Robert Kiyosaki的定义，资产是能给你口袋带来现金的东西。自住房虽然可能升值，但每月会产生支出，因此不算是资产。")
-else:
-    st.error("不正确。自住房虽然可能升值，但每月会产生支出（如房贷、物业费等），因此根据Robert Kiyosaki的定义，它不算是资产。资产应该是能给你带来现金流入的东西。")
+    if q1 == "自住房":
+        st.success("正确！根据Robert Kiyosaki的定义，资产是能给你口袋带来现金的东西。自住房虽然可能升值，但每月会产生支出，因此不算是资产。")
+    else:
+        st.error("不正确。自住房虽然可能升值，但每月会产生支出（如房贷、物业费等），因此根据Robert Kiyosaki的定义，它不算是资产。资产应该是能给你带来现金流入的东西。")
+
+financial_quiz()
 
 # 结语
 st.markdown("---")
 st.write("记住，财务自由是一段旅程，而不是终点。持续学习、明智决策，并定期审视你的财务状况。")
 st.write("关注现金流，而不仅仅是净资产。努力将被动收入提高到超过支出的水平，这才是真正的财务自由。")
-st.write("本应用仅供教育目的，不构成专业财务建议。对于具体的财务决策，请咨询专业的财务顾问。")
\ No newline at end of file
+st.write("本应用仅供教育目的，不构成专业财务建议。对于具体的财务决策，请咨询专业的财务顾问。")
+
+profiler.finish()
\ No newline at end of file
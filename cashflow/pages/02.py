@@ -1,12 +1,19 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 import json
+import ledger
+import ledger_store
+from figure_cache import cached_figure, cached_result, fingerprint
+import profiling
+import warmup
+
+# plotly 在绘图函数内按需导入，并由 warmup 在后台线程中提前加载
 
 # 设置页面配置
 st.set_page_config(page_title="足彩投资记录与分析", layout="wide")
+warmup.start()
+profiler = profiling.start("02")
 
 # 设置全局主题颜色
 theme_colors = {
@@ -15,37 +22,206 @@ theme_colors = {
     "background": "#f0f2f6",
     "text": "#2c3e50"
 }
+theme_layout = dict(
+    plot_bgcolor=theme_colors['background'],
+    paper_bgcolor=theme_colors['background'],
+    font=dict(color=theme_colors['text'])
+)
+
+DATA_FILE = "足彩投资记录.json"
+COLUMNS = ledger.COLUMNS
+# 样式表格（Styler）逐个单元格渲染，1万条记录约 1 秒，超过约 3.2 万条时 pandas 直接拒绝渲染
+STYLED_TABLE_MAX_ROWS = 1_000
+
+def set_data(df):
+    # 投注记录每次变化时计算一次内容指纹作为版本号；图表和分析结果的缓存按版本号取值，
+    # 不必在每次 rerun 时对整个 DataFrame 计算哈希，加载了相同记录的会话也能共用缓存
+    st.session_state.data = df
+    st.session_state.data_version = fingerprint(df)
 
 # 初始化会话状态
 if 'data' not in st.session_state:
-    st.session_state.data = pd.DataFrame(columns=["日期", "比赛", "投注类型", "赔率", "投注金额", "结果"])
+    set_data(pd.DataFrame(columns=COLUMNS))
+if 'unsaved_records' not in st.session_state:
+    st.session_state.unsaved_records = []  # 本会话新增、尚未提交保存的记录
+if 'save_failures' not in st.session_state:
+    # 写入服务在后台线程中把失败的保存操作放进这个列表，下一次 rerun 时显示并恢复记录
+    st.session_state.save_failures = []
 
 # 辅助函数
-def save_data():
-    st.session_state.data.to_json("足彩投资记录.json", orient="records", date_format="iso")
-    st.success("数据已保存")
+@st.cache_resource
+def get_ledger_writer():
+    # 每个进程共享同一个写入服务，所有会话的保存操作都由它串行落盘
+    return ledger_store.LedgerWriter(DATA_FILE)
+
+def watch_save(future, records):
+    # 回调在写入线程中执行，不能访问 st.session_state，只向会话自己的失败列表追加
+    failures = st.session_state.save_failures
+
+    def on_done(done):
+        if done.exception() is not None:
+            failures.append((records, done.exception()))
+
+    future.add_done_callback(on_done)
+
+def report_save_failures():
+    failures = st.session_state.save_failures
+    while failures:
+        records, error = failures.pop(0)
+        if records:
+            # 写入失败的记录放回未保存列表，下次点击“保存数据”时重试
+            st.session_state.unsaved_records[:0] = records
+            st.error(f"保存失败，{len(records)} 条记录尚未保存，请稍后重试：{error}")
+        else:
+            st.error(f"清空数据未能保存：{error}")
+
+def save_data(replace=False):
+    writer = get_ledger_writer()
+    if replace:
+        watch_save(writer.replace([]), [])
+    elif st.session_state.unsaved_records:
+        # 只追加本会话新增的记录，不会覆盖其他会话已经保存的数据
+        records = st.session_state.unsaved_records
+        watch_save(writer.append(records), records)
+    st.session_state.unsaved_records = []
+    st.success("数据已提交保存")
 
 def load_data():
-    try:
-        df = pd.read_json("足彩投资记录.json", orient="records")
-        st.session_state.data = df
-        st.success("数据已成功加载")
-    except FileNotFoundError:
+    writer = get_ledger_writer()
+    writer.flush()
+    records = writer.read()
+    if records is None:
         st.error("未找到保存的数据文件")
+        return
+    set_data(pd.DataFrame.from_records(records, columns=COLUMNS))
+    st.session_state.unsaved_records = []
+    st.success("数据已成功加载")
 
 def clear_data():
-    st.session_state.data = pd.DataFrame(columns=["日期", "比赛", "投注类型", "赔率", "投注金额", "结果"])
-    if st.button("确认清空数据"):
+    set_data(pd.DataFrame(columns=COLUMNS))
+    st.session_state.unsaved_records = []
+    st.session_state.confirm_clear = False
+    save_data(replace=True)
+    st.success("所有数据已清空")
+
+# 图表和分析结果按数据版本号缓存，所有会话共享；投注记录以 _df 传入，不参与缓存键
+@cached_figure
+def profit_trend_figure(data_version, _df):
+    import plotly.graph_objects as go
+
+    fig_profit_trend = go.Figure()
+    fig_profit_trend.add_trace(go.Scatter(
+        x=_df['日期'], 
+        y=_df['盈亏'].cumsum(), 
+        mode='lines+markers',
+        name='累计盈亏',
+        line=dict(color=theme_colors['primary'], width=2),
+        marker=dict(size=6, color=theme_colors['secondary'])
+    ))
+    fig_profit_trend.update_layout(
+        title='累计盈亏趋势',
+        xaxis_title='日期',
+        yaxis_title='累计盈亏 (¥)',
+        **theme_layout
+    )
+    return fig_profit_trend
+
+@cached_figure
+def bet_type_figure(data_version, _df):
+    import plotly.express as px
+
+    fig_bet_type = px.pie(
+        _df, 
+        names='投注类型', 
+        values='投注金额',
+        title='投注类型分布',
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig_bet_type.update_traces(textposition='inside', textinfo='percent+label')
+    fig_bet_type.update_layout(**theme_layout)
+    return fig_bet_type
+
+@cached_figure
+def stake_distribution_figure(data_version, _df):
+    import plotly.express as px
+
+    fig_stake_dist = px.histogram(
+        _df, 
+        x='投注金额', 
+        title='投注金额分布',
+        color_discrete_sequence=[theme_colors['primary']]
+    )
+    fig_stake_dist.update_layout(
+        xaxis_title='投注金额 (¥)',
+        yaxis_title='频次',
+        **theme_layout
+    )
+    return fig_stake_dist
+
+@cached_figure
+def odds_profit_figure(data_version, _df):
+    import plotly.express as px
+
+    fig_odds_profit = px.scatter(
+        _df, 
+        x='赔率', 
+        y='盈亏', 
+        color='是否盈利',
+        size='投注金额',
+        hover_data=['比赛', '投注类型', '结果'],
+        title='赔率与盈亏关系',
+        color_discrete_map={True: theme_colors['primary'], False: theme_colors['secondary']}
+    )
+    fig_odds_profit.update_layout(
+        xaxis_title='赔率',
+        yaxis_title='盈亏 (¥)',
+        **theme_layout
+    )
+    return fig_odds_profit
+
+@cached_result
+def performance_by(data_version, _df, column):
+    return ledger.performance_by(_df, column)
+
+@cached_figure
+def performance_figure(performance, column, title):
+    import plotly.graph_objects as go
+
+    fig_performance = go.Figure()
+    fig_performance.add_trace(go.Bar(
+        x=performance[column],
+        y=performance['ROI'],
+        name='ROI (%)',
+        marker_color=theme_colors['primary']
+    ))
+    fig_performance.add_trace(go.Bar(
+        x=performance[column],
+        y=performance['胜率'],
+        name='胜率 (%)',
+        marker_color=theme_colors['secondary']
+    ))
+    fig_performance.update_layout(
+        title=title,
+        barmode='group',
+        xaxis_title=column,
+        yaxis_title='百分比 (%)',
+        **theme_layout
+    )
+    return fig_performance
+
+# 保存和导出按钮作为独立片段（fragment）运行：它们不改变 st.session_state.data，
+# 点击时不必重新计算和发送整个分析页面。加载和清空会改变数据，仍然完整重新运行
+@st.fragment
+def save_controls():
+    report_save_failures()
+    if st.button("保存数据"):
         save_data()
-        st.success("所有数据已清空并保存")
 
-def calculate_profit(row):
-    if row['结果'] == '未开奖':
-        return 0
-    elif row['结果'] == row['投注类型']:
-        return row['投注金额'] * (row['赔率'] - 1)
-    else:
-        return -row['投注金额']
+@st.fragment
+def export_data(df):
+    if st.button("导出数据"):
+        df.to_csv("足彩投资记录.csv", index=False)
+        st.success("数据已导出到 '足彩投资记录.csv'")
 
 # 标题和介绍
 st.title("足彩投资记录与分析")
@@ -74,28 +250,35 @@ with st.sidebar:
                 "投注金额": [stake],
                 "结果": [result]
             })
-            st.session_state.data = pd.concat([st.session_state.data, new_record], ignore_index=True)
+            set_data(pd.concat([st.session_state.data, new_record], ignore_index=True))
+            st.session_state.unsaved_records.extend(
+                json.loads(new_record.to_json(orient="records", date_format="iso"))
+            )
             st.success("记录已添加")
 
-    if st.button("保存数据"):
-        save_data()
+    save_controls()
 
     if st.button("加载保存的数据"):
         load_data()
 
+    # 确认按钮在下一次 rerun 中才会被点击，此时“清空数据”按钮已经是 False，
+    # 所以用会话状态记住有一个待确认的清空操作
     if st.button("清空数据"):
-        clear_data()
+        st.session_state.confirm_clear = True
+    if st.session_state.get("confirm_clear"):
+        st.warning("确定要清空所有记录吗？已保存的记录文件也会被清空。")
+        confirm_col, cancel_col = st.columns(2)
+        if confirm_col.button("确认清空数据"):
+            clear_data()
+        elif cancel_col.button("取消"):
+            st.session_state.confirm_clear = False
+            st.rerun()
 
 # 主页面：数据展示和分析
 if not st.session_state.data.empty:
-    df = st.session_state.data.copy()
-    
-    # Ensure all numeric columns are properly typed
-    df['赔率'] = pd.to_numeric(df['赔率'], errors='coerce')
-    df['投注金额'] = pd.to_numeric(df['投注金额'], errors='coerce')
-    
-    df['盈亏'] = df.apply(calculate_profit, axis=1)
-    df['是否盈利'] = df['盈亏'] > 0
+    with profiler.section("盈亏计算"):
+        df = ledger.with_profit(st.session_state.data)
+    version = st.session_state.data_version
 
     # 总体统计
     total_bets = len(df)
@@ -117,157 +300,37 @@ if not st.session_state.data.empty:
     tab1, tab2, tab3 = st.tabs(["盈亏趋势", "投注分析", "赔率分析"])
 
     with tab1:
-        fig_profit_trend = go.Figure()
-        fig_profit_trend.add_trace(go.Scatter(
-            x=df['日期'], 
-            y=df['盈亏'].cumsum(), 
-            mode='lines+markers',
-            name='累计盈亏',
-            line=dict(color=theme_colors['primary'], width=2),
-            marker=dict(size=6, color=theme_colors['secondary'])
-        ))
-        fig_profit_trend.update_layout(
-            title='累计盈亏趋势',
-            xaxis_title='日期',
-            yaxis_title='累计盈亏 (¥)',
-            plot_bgcolor=theme_colors['background'],
-            paper_bgcolor=theme_colors['background'],
-            font=dict(color=theme_colors['text'])
-        )
-        st.plotly_chart(fig_profit_trend, use_container_width=True)
+        profiler.plotly_chart("累计盈亏趋势", profit_trend_figure(version, df), use_container_width=True)
 
     with tab2:
         col1, col2 = st.columns(2)
         with col1:
-            fig_bet_type = px.pie(
-                df, 
-                names='投注类型', 
-                values='投注金额',
-                title='投注类型分布',
-                color_discrete_sequence=px.colors.qualitative.Set3
-            )
-            fig_bet_type.update_traces(textposition='inside', textinfo='percent+label')
-            fig_bet_type.update_layout(
-                plot_bgcolor=theme_colors['background'],
-                paper_bgcolor=theme_colors['background'],
-                font=dict(color=theme_colors['text'])
-            )
-            st.plotly_chart(fig_bet_type, use_container_width=True)
+            profiler.plotly_chart("投注类型分布", bet_type_figure(version, df), use_container_width=True)
         
         with col2:
-            fig_stake_dist = px.histogram(
-                df, 
-                x='投注金额', 
-                title='投注金额分布',
-                color_discrete_sequence=[theme_colors['primary']]
-            )
-            fig_stake_dist.update_layout(
-                xaxis_title='投注金额 (¥)',
-                yaxis_title='频次',
-                plot_bgcolor=theme_colors['background'],
-                paper_bgcolor=theme_colors['background'],
-                font=dict(color=theme_colors['text'])
-            )
-            st.plotly_chart(fig_stake_dist, use_container_width=True)
+            profiler.plotly_chart("投注金额分布", stake_distribution_figure(version, df), use_container_width=True)
 
     with tab3:
         # Ensure '投注金额' is numeric
         df['投注金额'] = pd.to_numeric(df['投注金额'], errors='coerce')
         
-        fig_odds_profit = px.scatter(
-            df, 
-            x='赔率', 
-            y='盈亏', 
-            color='是否盈利',
-            size='投注金额',
-            hover_data=['比赛', '投注类型', '结果'],
-            title='赔率与盈亏关系',
-            color_discrete_map={True: theme_colors['primary'], False: theme_colors['secondary']}
-        )
-        fig_odds_profit.update_layout(
-            xaxis_title='赔率',
-            yaxis_title='盈亏 (¥)',
-            plot_bgcolor=theme_colors['background'],
-            paper_bgcolor=theme_colors['background'],
-            font=dict(color=theme_colors['text'])
-        )
-        st.plotly_chart(fig_odds_profit, use_container_width=True)
+        profiler.plotly_chart("赔率与盈亏关系", odds_profit_figure(version, df), use_container_width=True)
 
     # 投注策略分析
     st.header("投注策略分析")
     tab1, tab2 = st.tabs(["投注类型分析", "赔率区间分析"])
 
     with tab1:
-        performance_by_type = df.groupby('投注类型').agg({
-            '投注金额': 'sum',
-            '盈亏': 'sum',
-            '是否盈利': 'mean'
-        }).reset_index()
-        performance_by_type['ROI'] = performance_by_type.apply(
-            lambda row: (row['盈亏'] / row['投注金额'] * 100) if row['投注金额'] != 0 else 0, axis=1
-        )
-        performance_by_type['胜率'] = performance_by_type['是否盈利'] * 100
-        
-        fig_performance_by_type = go.Figure()
-        fig_performance_by_type.add_trace(go.Bar(
-            x=performance_by_type['投注类型'],
-            y=performance_by_type['ROI'],
-            name='ROI (%)',
-            marker_color=theme_colors['primary']
-        ))
-        fig_performance_by_type.add_trace(go.Bar(
-            x=performance_by_type['投注类型'],
-            y=performance_by_type['胜率'],
-            name='胜率 (%)',
-            marker_color=theme_colors['secondary']
-        ))
-        fig_performance_by_type.update_layout(
-            title='各投注类型表现',
-            barmode='group',
-            xaxis_title='投注类型',
-            yaxis_title='百分比 (%)',
-            plot_bgcolor=theme_colors['background'],
-            paper_bgcolor=theme_colors['background'],
-            font=dict(color=theme_colors['text'])
-        )
-        st.plotly_chart(fig_performance_by_type, use_container_width=True)
+        with profiler.section("分组统计"):
+            performance_by_type = performance_by(version, df, '投注类型')
+        profiler.plotly_chart("各投注类型表现", performance_figure(performance_by_type, '投注类型', '各投注类型表现'), use_container_width=True)
         st.dataframe(performance_by_type)
 
     with tab2:
-        df['赔率区间'] = pd.cut(df['赔率'], bins=[1, 1.5, 2, 2.5, 3, float('inf')], labels=['1.0-1.5', '1.5-2.0', '2.0-2.5', '2.5-3.0', '3.0+'])
-        performance_by_odds = df.groupby('赔率区间').agg({
-            '投注金额': 'sum',
-            '盈亏': 'sum',
-            '是否盈利': 'mean'
-        }).reset_index()
-        performance_by_odds['ROI'] = performance_by_odds.apply(
-            lambda row: (row['盈亏'] / row['投注金额'] * 100) if row['投注金额'] != 0 else 0, axis=1
-        )
-        performance_by_odds['胜率'] = performance_by_odds['是否盈利'] * 100
-        
-        fig_performance_by_odds = go.Figure()
-        fig_performance_by_odds.add_trace(go.Bar(
-            x=performance_by_odds['赔率区间'],
-            y=performance_by_odds['ROI'],
-            name='ROI (%)',
-            marker_color=theme_colors['primary']
-        ))
-        fig_performance_by_odds.add_trace(go.Bar(
-            x=performance_by_odds['赔率区间'],
-            y=performance_by_odds['胜率'],
-            name='胜率 (%)',
-            marker_color=theme_colors['secondary']
-        ))
-        fig_performance_by_odds.update_layout(
-            title='各赔率区间表现',
-            barmode='group',
-            xaxis_title='赔率区间',
-            yaxis_title='百分比 (%)',
-            plot_bgcolor=theme_colors['background'],
-            paper_bgcolor=theme_colors['background'],
-            font=dict(color=theme_colors['text'])
-        )
-        st.plotly_chart(fig_performance_by_odds, use_container_width=True)
+        df['赔率区间'] = ledger.odds_range(df)
+        with profiler.section("分组统计"):
+            performance_by_odds = performance_by(version, df, '赔率区间')
+        profiler.plotly_chart("各赔率区间表现", performance_figure(performance_by_odds, '赔率区间', '各赔率区间表现'), use_container_width=True)
         st.dataframe(performance_by_odds)
 
     # 投注建议
@@ -291,14 +354,19 @@ if not st.session_state.data.empty:
 
     # 数据表格
     st.header("投注记录")
-    st.dataframe(df.style.highlight_max(axis=0, subset=['盈亏'], color='lightgreen')
-                   .highlight_min(axis=0, subset=['盈亏'], color='lightcoral'))
+    with profiler.section("样式表格"):
+        if len(df) <= STYLED_TABLE_MAX_ROWS:
+            st.dataframe(df.style.highlight_max(axis=0, subset=['盈亏'], color='lightgreen')
+                           .highlight_min(axis=0, subset=['盈亏'], color='lightcoral'))
+        else:
+            st.dataframe(df)
+            st.caption(f"记录超过 {STYLED_TABLE_MAX_ROWS:,} 条，表格不再高亮最大 / 最小盈亏。")
 
     # 导出数据
-    if st.button("导出数据"):
-        df.to_csv("足彩投资记录.csv", index=False)
-        st.success("数据已导出到 '足彩投资记录.csv'")
+    export_data(df)
 
 else:
     st.info("还没有投注记录，请在左侧添加新的记录")
 
+profiler.finish()
+
@@ -0,0 +1,252 @@
+"""页面重新运行（rerun）的性能分析工具。
+
+默认关闭，关闭时各个方法几乎没有开销。开启方式：
+- 在页面地址后加上 ``?profile=1``；或
+- 设置环境变量 ``CASHFLOW_PROFILE=1``（对所有会话生效）。
+
+开启后每次 rerun 会记录各个命名区段的耗时和每个图表发送的 Plotly JSON 字节数，
+并在侧边栏的“性能分析”面板里显示本次数值和滚动分位数。设置 ``CASHFLOW_PROFILE_LOG=<路径>``
+后每次完整 rerun 和每次片段单独重新运行都会向该文件追加一行 JSON，便于离线分析。
+
+峰值内存用 tracemalloc 记录。tracemalloc 是进程级的，开启后所有会话的内存分配都会变慢
+数倍，所以只在用环境变量对整个进程开启时记录；``?profile=1`` 只记录耗时和图表大小。
+峰值同样是进程级的：多个会话同时 rerun 时，只在没有其他进行中的 rerun 时才重置峰值，
+记录到的是这段时间内整个进程的峰值。
+
+用法::
+
+    profiler = profiling.start("00")
+    with profiler.section("财务模拟"):
+        ...
+    profiler.plotly_chart("投资增长曲线", fig, use_container_width=True)
+    profiler.finish()
+
+片段（fragment）函数用 ``@profiling.timed("名称")`` 计时，内部用 ``profiling.current()``
+取得本会话的分析器。片段单独重新运行时页面脚本的其余部分（包括 ``finish()``）不会执行，
+``timed`` 会为这次运行单独写一行带 ``"fragment"`` 字段的日志；区段耗时照常计入滚动统计，
+下一次完整 rerun 时显示在面板中。
+"""
+
+import json
+import math
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+import streamlit as st
+
+import figure_cache
+
+WINDOW = 200  # 每个指标保留最近多少次记录用于计算分位数
+PERCENTILES = (50, 90, 99)
+
+_history = defaultdict(lambda: deque(maxlen=WINDOW))
+_history_lock = threading.Lock()
+_log_lock = threading.Lock()
+_memory_lock = threading.Lock()
+_memory_users = 0  # 正在记录峰值内存的 rerun 数
+
+
+def percentile(values, q):
+    """最近秩法分位数，``values`` 为空时返回 None。"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def _record(page, metric, value):
+    with _history_lock:
+        _history[(page, metric)].append(value)
+
+
+def rolling_stats(page):
+    """返回某个页面各指标的滚动统计：{指标: {"count", "p50", "p90", "p99"}}。"""
+    with _history_lock:
+        snapshot = {metric: list(values) for (p, metric), values in _history.items() if p == page}
+    return {
+        metric: dict(count=len(values), **{f"p{q}": percentile(values, q) for q in PERCENTILES})
+        for metric, values in snapshot.items()
+    }
+
+
+def _enabled_for_process():
+    return os.environ.get("CASHFLOW_PROFILE") == "1"
+
+
+def _enabled_by_request():
+    if _enabled_for_process():
+        return True
+    try:
+        return st.query_params.get("profile") == "1"
+    except Exception:
+        return False
+
+
+class RerunProfiler:
+    """记录一次 rerun 内各区段的耗时和图表大小。"""
+
+    def __init__(self, page, enabled, log_path=None, trace_memory=False):
+        self.page = page
+        self.enabled = enabled
+        self.log_path = log_path
+        self.trace_memory = enabled and trace_memory
+        self.sections = {}  # 区段名 -> 毫秒
+        self.charts = {}  # 图表名 -> 字节数
+        self.finished = False
+        self._started = time.perf_counter()
+        self._tracing = False
+        self._begin_memory()
+
+    def _begin_memory(self):
+        global _memory_users
+        if not self.trace_memory or self._tracing:
+            return
+        with _memory_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if _memory_users == 0:
+                tracemalloc.reset_peak()
+            _memory_users += 1
+        self._tracing = True
+
+    def _end_memory(self):
+        """结束峰值内存记录并返回峰值字节数；未记录时返回 None。"""
+        global _memory_users
+        if not self._tracing:
+            return None
+        with _memory_lock:
+            _memory_users -= 1
+            peak = tracemalloc.get_traced_memory()[1]
+        self._tracing = False
+        return peak
+
+    def _log(self, entry):
+        if self.log_path:
+            with _log_lock, open(self.log_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    @contextmanager
+    def section(self, name):
+        """计时一个命名区段；同名区段在一次 rerun 内累加。"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.sections[name] = self.sections.get(name, 0.0) + elapsed
+            _record(self.page, f"区段:{name}", elapsed)
+
+    def plotly_chart(self, name, fig, **kwargs):
+        """代替 ``st.plotly_chart``：开启时额外记录图表的发送耗时和 JSON 字节数。
+
+        ``fig`` 可以是 Figure，也可以是 ``figure_cache.cached_figure`` 返回的图表字典。
+        """
+        fig = figure_cache.as_figure(fig)
+        if not self.enabled:
+            return st.plotly_chart(fig, **kwargs)
+        size = len(fig.to_json().encode("utf-8"))
+        self.charts[name] = size
+        _record(self.page, f"图表字节:{name}", size)
+        with self.section(f"图表:{name}"):
+            return st.plotly_chart(fig, **kwargs)
+
+    @contextmanager
+    def fragment_rerun(self, name):
+        """计时一次片段单独重新运行，并写一行日志。"""
+        if not self.enabled:
+            yield
+            return
+        self._begin_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = (time.perf_counter() - start) * 1000
+            peak = self._end_memory()
+            _record(self.page, f"区段:{name}", total)
+            self._log({
+                "ts": time.time(),
+                "page": self.page,
+                "fragment": name,
+                "total_ms": total,
+                "peak_memory_bytes": peak,
+            })
+
+    def finish(self):
+        """结束本次 rerun 的记录，写日志并显示调试面板。"""
+        self.finished = True
+        if not self.enabled:
+            return
+        total = (time.perf_counter() - self._started) * 1000
+        peak = self._end_memory()
+        _record(self.page, "rerun总耗时", total)
+        if peak is not None:
+            _record(self.page, "峰值内存", peak)
+        self._log({
+            "ts": time.time(),
+            "page": self.page,
+            "total_ms": total,
+            "peak_memory_bytes": peak,
+            "sections_ms": self.sections,
+            "chart_bytes": self.charts,
+        })
+        self._render_panel(total, peak)
+
+    def _render_panel(self, total, peak):
+        with st.sidebar.expander("性能分析", expanded=False):
+            st.metric("本次rerun耗时", f"{total:.1f} ms")
+            if peak is not None:
+                st.metric("峰值内存", f"{peak / 1024 / 1024:.1f} MB")
+            else:
+                st.caption("峰值内存只在设置环境变量 CASHFLOW_PROFILE=1 时记录")
+            current = {**{f"区段:{k}": v for k, v in self.sections.items()},
+                       **{f"图表字节:{k}": v for k, v in self.charts.items()}}
+            rows = [
+                {"指标": metric, "本次": current.get(metric), **stats}
+                for metric, stats in sorted(rolling_stats(self.page).items())
+            ]
+            st.dataframe(rows, use_container_width=True)
+            st.write("图表缓存", figure_cache.default_cache.stats())
+
+
+_DISABLED = RerunProfiler(page=None, enabled=False)
+
+
+def start(page):
+    """开始记录当前会话本次完整 rerun，并把分析器存入会话状态。"""
+    previous = st.session_state.get("_rerun_profiler")
+    if previous is not None:
+        # 上一次 rerun 被新的交互打断或抛出异常时没有执行 finish()，在这里释放它的内存记录
+        previous._end_memory()
+    profiler = RerunProfiler(page, _enabled_by_request(), os.environ.get("CASHFLOW_PROFILE_LOG"),
+                             trace_memory=_enabled_for_process())
+    st.session_state["_rerun_profiler"] = profiler
+    return profiler
+
+
+def current():
+    """返回本会话当前的分析器；未调用过 ``start`` 时返回一个关闭状态的分析器。"""
+    return st.session_state.get("_rerun_profiler", _DISABLED)
+
+
+def timed(name):
+    """把整个函数作为一个命名区段计时，适用于片段函数。"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = current()
+            # 分析器已经 finish() 说明这是片段单独重新运行，单独记录一行日志
+            timer = profiler.fragment_rerun(name) if profiler.finished else profiler.section(name)
+            with timer:
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,30 @@
+"""财务模拟的计算内核，与页面无关，便于缓存和基准测试。"""
+
+
+def growth_curve(simulation_years, rate_monthly, monthly_investment):
+    """每月定投的逐年价值，返回长度为 ``simulation_years + 1`` 的列表。"""
+    values = []
+    current_value = 0
+    for year in range(simulation_years + 1):
+        for month in range(12):
+            current_value = current_value * (1 + rate_monthly) + monthly_investment
+
+        values.append(current_value)
+    return values
+
+
+def years_to_target(investment_return, monthly_investment, target_passive_income):
+    """返回月被动收入达到目标所需的年数，100年内无法达到时返回0。"""
+    total_investment_value = 0
+    monthly_rate = investment_return / 12
+
+    for year in range(1, 101):  # 最多模拟100年
+        for month in range(12):
+            total_investment_value = (total_investment_value + monthly_investment) * (1 + monthly_rate)
+
+        annual_passive_income = total_investment_value * investment_return
+        monthly_passive_income = annual_passive_income / 12
+
+        if monthly_passive_income >= target_passive_income:
+            return year
+    return 0
@@ -0,0 +1,129 @@
+"""按月保存的财务快照（SQLite），用于绘制长期趋势。
+
+每个档案（profile）在每个页面（source）下每月最多一行，主键 ``(profile, source, month)``
+建成 WITHOUT ROWID 表，数据按主键聚簇存放，读取某个档案多年的月度快照只需一次索引范围扫描。
+
+写入时顺带维护环比（与上一份快照的差值）：插入或更新某个月时，只需重新计算该月和
+紧随其后的那个月两行的差值，不必重算整个序列。本模块不依赖 streamlit。
+"""
+
+import math
+import sqlite3
+from datetime import datetime
+
+DEFAULT_PATH = "财务快照.sqlite3"
+
+# 快照保存的数值字段；比例类指标统一保存为小数（0.25 表示 25%）
+FIELDS = (
+    "income", "expenses", "cash", "assets", "liabilities",
+    "net_worth", "savings_rate", "debt_to_income", "passive_income_ratio",
+)
+# 维护环比差值的趋势指标
+TRENDS = ("net_worth", "savings_rate", "debt_to_income", "passive_income_ratio")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshots (
+    profile TEXT NOT NULL,
+    source TEXT NOT NULL,
+    month TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    {", ".join(f"{field} REAL" for field in FIELDS)},
+    {", ".join(f"delta_{field} REAL" for field in TRENDS)},
+    PRIMARY KEY (profile, source, month)
+) WITHOUT ROWID
+"""
+
+
+def _clean(value):
+    # 无穷大 / NaN（例如支出为0时的比例）保存为 NULL
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _delta(current, previous):
+    if current is None or previous is None:
+        return None
+    return current - previous
+
+
+class SnapshotStore:
+    """财务快照存储，每次操作使用独立的连接，可在多个会话线程中共享。"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record(self, profile, source, values, month=None):
+        """保存 ``profile`` 在 ``month``（默认当月，格式 YYYY-MM）的快照。
+
+        同一个月再次保存会覆盖该月的数值；数值未变化时不写入。返回是否写入了数据。
+        """
+        month = month or datetime.now().strftime("%Y-%m")
+        row = {field: _clean(values.get(field)) for field in FIELDS}
+        conn = self._connect()
+        try:
+            with conn:
+                existing = conn.execute(
+                    f"SELECT {', '.join(FIELDS)} FROM snapshots WHERE profile = ? AND source = ? AND month = ?",
+                    (profile, source, month),
+                ).fetchone()
+                if existing is not None and all(existing[field] == row[field] for field in FIELDS):
+                    return False
+
+                previous = self._neighbour(conn, profile, source, month, before=True)
+                deltas = {
+                    f"delta_{field}": _delta(row[field], previous[field] if previous else None)
+                    for field in TRENDS
+                }
+                columns = ["profile", "source", "month", "taken_at", *FIELDS, *deltas]
+                conn.execute(
+                    f"INSERT OR REPLACE INTO snapshots ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})",
+                    (profile, source, month, datetime.now().isoformat(timespec="seconds"),
+                     *row.values(), *deltas.values()),
+                )
+
+                following = self._neighbour(conn, profile, source, month, before=False)
+                if following is not None:
+                    conn.execute(
+                        f"UPDATE snapshots SET {', '.join(f'delta_{field} = ?' for field in TRENDS)} "
+                        "WHERE profile = ? AND source = ? AND month = ?",
+                        (*(_delta(following[field], row[field]) for field in TRENDS),
+                         profile, source, following["month"]),
+                    )
+            return True
+        finally:
+            conn.close()
+
+    def _neighbour(self, conn, profile, source, month, before):
+        op, order = ("<", "DESC") if before else (">", "ASC")
+        return conn.execute(
+            f"SELECT month, {', '.join(TRENDS)} FROM snapshots "
+            f"WHERE profile = ? AND source = ? AND month {op} ? ORDER BY month {order} LIMIT 1",
+            (profile, source, month),
+        ).fetchone()
+
+    def history(self, profile, source, start=None, end=None):
+        """按月份顺序返回某个档案在 ``[start, end]`` 区间内的快照（字典列表）。"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM snapshots WHERE profile = ? AND source = ? AND month BETWEEN ? AND ? "
+                "ORDER BY month",
+                (profile, source, start or "0000-00", end or "9999-99"),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
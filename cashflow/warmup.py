@@ -0,0 +1,30 @@
+"""在后台线程中预先导入页面共用的重型模块。
+
+页面只在真正绘图时才导入 pandas / plotly；第一次打开任一页面时调用 ``start()``，
+这些模块会在后台加载，等页面渲染到图表时通常已经导入完毕。每个进程只执行一次。
+"""
+
+import importlib
+import threading
+
+MODULES = ("numpy", "pandas", "plotly.graph_objects", "plotly.express", "plotly.io")
+
+_started = False
+_lock = threading.Lock()
+
+
+def _import_all():
+    for name in MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def start():
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_import_all, name="cashflow-warmup", daemon=True).start()
@@ -0,0 +1,97 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cashflow"))
+
+import drawdown  # noqa: E402
+
+
+def reference(portfolio, withdrawal, inflation, returns):
+    """逐年循环：年初提取通胀调整后的生活费，余额不足即失败，剩余部分按当年收益率增长。"""
+    successes = 0
+    balances = []
+    for path in returns:
+        balance = float(portfolio)
+        row = [balance]
+        failed = False
+        for year, rate in enumerate(path):
+            balance -= withdrawal * (1 + inflation) ** year
+            if balance < 0:
+                failed = True
+            balance *= 1 + rate
+            row.append(max(balance, 0.0))
+        successes += not failed
+        balances.append(row)
+    balances = np.array(balances)
+    return {
+        "success_rate": successes / len(returns),
+        "balance_bands": {p: np.percentile(balances, p, axis=0) for p in drawdown.PERCENTILES},
+    }
+
+
+def assert_matches_reference(result, expected):
+    assert result["success_rate"] == pytest.approx(expected["success_rate"])
+    for p in drawdown.PERCENTILES:
+        np.testing.assert_allclose(result["balance_bands"][p], expected["balance_bands"][p], rtol=1e-9, atol=1e-6)
+
+
+@pytest.fixture
+def returns():
+    # 固定的收益路径，刻意包含会耗尽资产的熊市路径
+    rng = np.random.default_rng(42)
+    return rng.normal(0.05, 0.18, size=(37, 25)).clip(-0.6, 0.8)
+
+
+def test_matches_year_by_year_loop(returns):
+    result = drawdown.simulate(1_000_000, 55_000, 0.03, 25, returns=returns, sample=len(returns))
+    expected = reference(1_000_000, 55_000, 0.03, returns)
+    assert 0 < expected["success_rate"] < 1
+    assert_matches_reference(result, expected)
+    assert result["ending_balance"][50] == pytest.approx(expected["balance_bands"][50][-1])
+
+
+def test_zero_withdrawal_always_succeeds(returns):
+    result = drawdown.simulate(500_000, 0, 0.03, 25, returns=returns, sample=len(returns))
+    assert result["withdrawal_rate"] == 0
+    assert result["success_rate"] == 1.0
+    assert_matches_reference(result, reference(500_000, 0, 0.03, returns))
+    growth = np.prod(1 + returns, axis=1) * 500_000
+    assert result["ending_balance"][50] == pytest.approx(np.percentile(growth, 50))
+
+
+def test_paths_not_a_multiple_of_chunk_size(returns):
+    # 37 条路径，每块 10 条：最后一块只有 7 条
+    result = drawdown.simulate(1_000_000, 55_000, 0.03, 25, returns=returns, chunk_size=10, sample=len(returns))
+    assert result["paths"] == 37
+    assert_matches_reference(result, reference(1_000_000, 55_000, 0.03, returns))
+
+
+def test_random_paths_do_not_depend_on_chunk_size():
+    kwargs = dict(portfolio=1_000_000, withdrawal=45_000, inflation=0.03, years=30, paths=25, sample=25, seed=3)
+    whole = drawdown.simulate(chunk_size=100, **kwargs)
+    chunked = drawdown.simulate(chunk_size=10, **kwargs)
+    assert chunked["success_rate"] == whole["success_rate"]
+    for p in drawdown.PERCENTILES:
+        np.testing.assert_allclose(chunked["balance_bands"][p], whole["balance_bands"][p])
+
+
+def test_rolling_windows_wrap_around():
+    history = [0.10, -0.20, 0.05, 0.30, -0.10]
+    windows = drawdown.rolling_windows(history, 8)
+    assert windows.shape == (5, 8)
+    for start in range(5):
+        assert windows[start].tolist() == [history[(start + year) % 5] for year in range(8)]
+
+    result = drawdown.simulate(1_000_000, 60_000, 0.02, 8, returns=windows, sample=5)
+    assert_matches_reference(result, reference(1_000_000, 60_000, 0.02, windows))
+
+
+def test_sampled_bands_have_one_column_per_year(returns):
+    result = drawdown.simulate(1_000_000, 55_000, 0.03, 25, returns=returns, chunk_size=10, sample=8)
+    for p in drawdown.PERCENTILES:
+        assert result["balance_bands"][p].shape == (26,)
+        assert result["balance_bands"][p][0] == 1_000_000
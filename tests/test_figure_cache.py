@@ -0,0 +1,112 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cashflow"))
+
+import figure_cache  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(figure_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = figure_cache.FigureCache(max_bytes=30, ttl=None)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    cache.put("c", b"x" * 10)
+    assert cache.get("a") is not None  # a 变成最近使用，b 成为最旧的
+    cache.put("d", b"x" * 10)
+    assert cache.get("b") is None
+    assert [cache.get(k) is not None for k in "acd"] == [True, True, True]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 30
+
+
+def test_value_larger_than_capacity_is_not_cached(clock):
+    cache = figure_cache.FigureCache(max_bytes=10, ttl=None)
+    cache.put("a", b"x" * 5)
+    cache.put("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"x" * 5
+
+
+def test_ttl_expiry(clock):
+    cache = figure_cache.FigureCache(max_bytes=100, ttl=60)
+    cache.put("a", b"1")
+    clock[0] += 59
+    assert cache.get("a") == b"1"
+    clock[0] += 1
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["entries"] == 0
+    assert stats["bytes"] == 0
+
+
+def test_stats_counters(clock):
+    cache = figure_cache.FigureCache(max_bytes=100, ttl=None)
+    assert cache.stats()["hit_rate"] == 0.0
+    cache.put("a", b"12345")
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert (stats["entries"], stats["bytes"]) == (1, 5)
+    cache.put("a", b"123")  # 覆盖同一个键时按新值计算字节数
+    assert cache.stats()["bytes"] == 3
+
+
+def test_underscore_arguments_are_not_part_of_key():
+    cache = figure_cache.FigureCache()
+    calls = []
+
+    @figure_cache.cached_result(cache=cache)
+    def total(version, _rows):
+        calls.append(version)
+        return sum(_rows)
+
+    assert total(1, [1, 2]) == 3
+    assert total(1, [10, 20]) == 3  # _rows 不参与缓存键，命中旧结果
+    assert total(version=2, _rows=[10, 20]) == 30
+    assert calls == [1, 2]
+
+
+def test_cached_result_returns_copies():
+    cache = figure_cache.FigureCache()
+
+    @figure_cache.cached_result(cache=cache)
+    def make(n):
+        return list(range(n))
+
+    make(3).append(99)
+    assert make(3) == [0, 1, 2]
+
+
+def test_unhashable_argument_raises_clear_error():
+    cache = figure_cache.FigureCache()
+
+    @figure_cache.cached_result(cache=cache)
+    def size(items):
+        return len(items)
+
+    with pytest.raises(TypeError, match="set"):
+        size({1, 2})
+    assert size([1, 2]) == 2
+    assert size({"a": [1, 2]}) == 1
+
+
+def test_fingerprint_follows_content():
+    pd = pytest.importorskip("pandas")
+    a = pd.DataFrame({"x": [1, 2], "y": ["a", "b"]})
+    assert figure_cache.fingerprint(a) == figure_cache.fingerprint(a.copy())
+    assert figure_cache.fingerprint(a) != figure_cache.fingerprint(a.assign(x=[1, 3]))
+    assert figure_cache.fingerprint(a) != figure_cache.fingerprint(a.rename(columns={"y": "z"}))
+    assert figure_cache.fingerprint(a) != figure_cache.fingerprint(a.astype({"x": float}))
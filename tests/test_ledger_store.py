@@ -0,0 +1,74 @@
+import os
+import stat
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cashflow"))
+
+import ledger_store  # noqa: E402
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "ledger.json")
+
+
+def test_append_merges_with_existing_records(path):
+    ledger_store.atomic_write(path, [{"id": 0}])
+    writer = ledger_store.LedgerWriter(path)
+    writer.append([{"id": 1}])
+    writer.append([{"id": 2}, {"id": 3}])
+    writer.flush()
+    assert writer.read() == [{"id": i} for i in range(4)]
+    writer.close()
+
+
+def test_replace_then_append_in_one_batch(path):
+    writer = ledger_store.LedgerWriter(path)
+    writer.append([{"id": 1}])
+    writer.replace([])
+    writer.append([{"id": 2}])
+    writer.flush()
+    assert writer.read() == [{"id": 2}]
+    writer.close()
+
+
+def test_two_writers_on_same_file_do_not_lose_records(path):
+    # 两个写者各自有写入线程，只靠文件锁互斥，对应两个进程写同一个文件
+    writers = [ledger_store.LedgerWriter(path) for _ in range(2)]
+    futures = [
+        writer.append([{"writer": i, "seq": seq}])
+        for seq in range(50)
+        for i, writer in enumerate(writers)
+    ]
+    for future in futures:
+        future.result(timeout=10)
+    saved = ledger_store.read_records(path)
+    assert len(saved) == 100
+    assert {(r["writer"], r["seq"]) for r in saved} == {(i, seq) for i in range(2) for seq in range(50)}
+    for writer in writers:
+        writer.close()
+
+
+def test_stress_with_processes(path):
+    result = ledger_store.stress(path, writers=4, records=25, processes=True)
+    assert result["lost"] == 0
+    assert result["saved"] == result["expected"] == 100
+
+
+def test_failed_write_is_reported_through_future(tmp_path):
+    writer = ledger_store.LedgerWriter(str(tmp_path / "missing" / "ledger.json"))
+    future = writer.append([{"id": 1}])
+    with pytest.raises(OSError):
+        future.result(timeout=10)
+    writer.close()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="文件权限只在 POSIX 上有意义")
+def test_atomic_write_keeps_file_mode(path):
+    ledger_store.atomic_write(path, [])
+    assert stat.S_IMODE(os.stat(path).st_mode) == ledger_store._NEW_FILE_MODE
+    os.chmod(path, 0o644)
+    ledger_store.atomic_write(path, [{"id": 1}])
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
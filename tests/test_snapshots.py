@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cashflow"))
+
+import snapshots  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    return snapshots.SnapshotStore(str(tmp_path / "snapshots.sqlite3"))
+
+
+def deltas(store):
+    return {row["month"]: row["delta_net_worth"] for row in store.history("p", "00")}
+
+
+def test_deltas_follow_month_order(store):
+    store.record("p", "00", {"net_worth": 100}, month="2024-01")
+    store.record("p", "00", {"net_worth": 300}, month="2024-03")
+    assert deltas(store) == {"2024-01": None, "2024-03": 200}
+
+    # 补录中间的月份：新行相对上一月计算，下一月的差值改为相对新行
+    store.record("p", "00", {"net_worth": 250}, month="2024-02")
+    assert deltas(store) == {"2024-01": None, "2024-02": 150, "2024-03": 50}
+
+    # 补录最早的月份：原来的第一行也要有差值
+    store.record("p", "00", {"net_worth": 40}, month="2023-12")
+    assert deltas(store)["2024-01"] == 60
+
+
+def test_overwriting_a_month_updates_following_delta(store):
+    store.record("p", "00", {"net_worth": 100}, month="2024-01")
+    store.record("p", "00", {"net_worth": 300}, month="2024-02")
+    store.record("p", "00", {"net_worth": 120}, month="2024-01")
+    assert deltas(store) == {"2024-01": None, "2024-02": 180}
+
+
+def test_unchanged_values_are_not_written(store):
+    values = {"income": 10000, "expenses": 6000, "savings_rate": 0.4}
+    assert store.record("p", "00", values, month="2024-01") is True
+    taken_at = store.history("p", "00")[0]["taken_at"]
+    assert store.record("p", "00", dict(values), month="2024-01") is False
+    assert store.record("p", "00", {**values, "income": 10001}, month="2024-01") is True
+    assert store.history("p", "00")[0]["taken_at"] >= taken_at
+
+
+def test_non_finite_values_are_stored_as_null(store):
+    values = {"net_worth": float("nan"), "debt_to_income": float("inf"), "savings_rate": -float("inf")}
+    assert store.record("p", "00", values, month="2024-01") is True
+    row = store.history("p", "00")[0]
+    assert row["net_worth"] is None
+    assert row["debt_to_income"] is None
+    assert row["savings_rate"] is None
+    # NULL 与 NULL 比较视为未变化
+    assert store.record("p", "00", values, month="2024-01") is False
+    store.record("p", "00", {"net_worth": 500}, month="2024-02")
+    assert deltas(store)["2024-02"] is None
+
+
+def test_profiles_and_sources_are_separate(store):
+    store.record("p", "00", {"net_worth": 100}, month="2024-01")
+    store.record("q", "00", {"net_worth": 900}, month="2024-02")
+    store.record("p", "01", {"net_worth": 700}, month="2024-02")
+    store.record("p", "00", {"net_worth": 150}, month="2024-02")
+    assert deltas(store) == {"2024-01": None, "2024-02": 50}
+    assert [row["month"] for row in store.history("p", "00", start="2024-02")] == ["2024-02"]